@@ -1,11 +1,72 @@
 import os
+from dataclasses import dataclass
+from functools import lru_cache
+
 from dotenv import load_dotenv
 
-load_dotenv()
+from shared.constants import SUPPORTED_IMAGE_FORMATS
+
+__all__ = [
+    'Settings', 'get_settings', 'settings',
+    'API_HOST', 'API_PORT', 'API_DEBUG', 'MODEL_PATH', 'USE_LOCAL_MODELS',
+    'CACHE_TTL', 'REDIS_URL', 'REDIS_MAX_CONNECTIONS', 'ALLOWED_ORIGINS',
+    'MAX_INMEM_UPLOAD', 'UVICORN_WORKERS', 'SUPPORTED_IMAGE_FORMATS_SET',
+]
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """Настройки API, прочитанные из окружения один раз при импорте"""
+    API_HOST: str
+    API_PORT: int
+    API_DEBUG: bool
+    MODEL_PATH: str
+    USE_LOCAL_MODELS: bool
+    CACHE_TTL: int
+    REDIS_URL: str
+    REDIS_MAX_CONNECTIONS: int
+    ALLOWED_ORIGINS: tuple
+    MAX_INMEM_UPLOAD: int
+    UVICORN_WORKERS: int
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Загружает .env и собирает настройки (кэшируется на весь процесс)"""
+    load_dotenv()
+    return Settings(
+        API_HOST=os.getenv('API_HOST', '0.0.0.0'),
+        API_PORT=int(os.getenv('API_PORT', '8000')),
+        API_DEBUG=os.getenv('API_DEBUG', 'False').lower() == 'true',
+        MODEL_PATH=os.getenv('MODEL_PATH', 'models/'),
+        USE_LOCAL_MODELS=os.getenv('USE_LOCAL_MODELS', 'False').lower() == 'true',
+        CACHE_TTL=int(os.getenv('CACHE_TTL', '3600')),
+        REDIS_URL=os.getenv('REDIS_URL', 'redis://redis:6379'),
+        REDIS_MAX_CONNECTIONS=int(os.getenv('REDIS_MAX_CONNECTIONS', '64')),
+        # Список origin через запятую, по умолчанию разрешены все
+        ALLOWED_ORIGINS=tuple(
+            origin.strip() for origin in os.getenv('ALLOWED_ORIGINS', '*').split(',') if origin.strip()
+        ),
+        # Загрузки не больше этого размера обрабатываются в памяти
+        MAX_INMEM_UPLOAD=int(os.getenv('MAX_INMEM_UPLOAD', str(2 * 1024 * 1024))),
+        # Обычно число ядер: один процесс с uvloop на ядро
+        UVICORN_WORKERS=int(os.getenv('UVICORN_WORKERS', '1')),
+    )
+
+
+settings = get_settings()
+
+# Имена модуля сохранены для обратной совместимости импортов
+API_HOST = settings.API_HOST
+API_PORT = settings.API_PORT
+API_DEBUG = settings.API_DEBUG
+MODEL_PATH = settings.MODEL_PATH
+USE_LOCAL_MODELS = settings.USE_LOCAL_MODELS
+CACHE_TTL = settings.CACHE_TTL
+REDIS_URL = settings.REDIS_URL
+REDIS_MAX_CONNECTIONS = settings.REDIS_MAX_CONNECTIONS
+ALLOWED_ORIGINS = settings.ALLOWED_ORIGINS
+MAX_INMEM_UPLOAD = settings.MAX_INMEM_UPLOAD
+UVICORN_WORKERS = settings.UVICORN_WORKERS
 
-API_HOST = os.getenv('API_HOST', '0.0.0.0')
-API_PORT = int(os.getenv('API_PORT', '8000'))
-API_DEBUG = os.getenv('API_DEBUG', 'False').lower() == 'true'
-MODEL_PATH = os.getenv('MODEL_PATH', 'models/')
-USE_LOCAL_MODELS = os.getenv('USE_LOCAL_MODELS', 'False').lower() == 'true'
-CACHE_TTL = int(os.getenv('CACHE_TTL', '3600'))
+# Расширения загрузок без точки, для проверки за O(1)
+SUPPORTED_IMAGE_FORMATS_SET = frozenset(SUPPORTED_IMAGE_FORMATS)
@@ -1,54 +1,172 @@
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
+import shutil
 import tempfile
+import time
 import os
-from datetime import datetime
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Tuple, Union
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import ValidationError
+import redis.asyncio as redis
 
-from api.config import API_HOST, API_PORT, API_DEBUG
+from api.config import (
+    API_HOST, API_PORT, API_DEBUG, REDIS_URL, REDIS_MAX_CONNECTIONS, ALLOWED_ORIGINS,
+    MAX_INMEM_UPLOAD, UVICORN_WORKERS, SUPPORTED_IMAGE_FORMATS_SET
+)
 from api.models.schemas import GenerateRequest, GenerateResponse, HealthResponse, ErrorResponse, ContentType
 from api.services.content_generator import content_generator
 from api.services.image_processor import ImageProcessor
+from api.services.openai_service import close_http_client, start_image_pool, shutdown_image_pool
 from api.middleware import LoggingMiddleware
-from api.middleware.rate_limiting import rate_limit_middleware
+from api.middleware.rate_limiting import rate_limit_middleware, rate_limiter
+from shared.exceptions import ContentGenerationError, FileProcessingError
 from shared.logging_config import setup_logging
 
+__all__ = ['app']
+
 setup_logging()
 logger = logging.getLogger(__name__)
 
+# Загрузки копируются на диск порциями, не целиком в память
+UPLOAD_CHUNK_SIZE = 64 * 1024
+UPLOAD_BUFFER_SIZE = 1024 * 1024
+# Потоки для дисковых операций и обработки изображений
+DISK_EXECUTOR_WORKERS = (os.cpu_count() or 1) * 2
+
 app = FastAPI(
     title="Product Content Generator API",
     description="API для генерации контента товаров",
     version="1.0.0",
-    debug=API_DEBUG
+    debug=API_DEBUG,
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(LoggingMiddleware)
 app.middleware("http")(rate_limit_middleware)
+# Добавляется последним, поэтому выполняется первым: preflight-запросы
+# завершаются в CORS и не доходят до логирования и rate limiting
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=list(ALLOWED_ORIGINS),
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type", "authorization"],
+    max_age=86400,
 )
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("API сервер запускается...")
+    # Блокирующая работа с диском уходит в to_thread, пул задаем явно
+    app.state.executor = ThreadPoolExecutor(max_workers=DISK_EXECUTOR_WORKERS, thread_name_prefix="disk")
+    asyncio.get_running_loop().set_default_executor(app.state.executor)
+    # Процессы обработки изображений стартуют здесь, а не на первом запросе
+    start_image_pool()
+    # Один пул соединений Redis на процесс с ограничением числа соединений
+    app.state.redis_pool = redis.ConnectionPool.from_url(
+        REDIS_URL,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        health_check_interval=30,
+        decode_responses=True
+    )
+    app.state.redis = redis.Redis(connection_pool=app.state.redis_pool)
+    rate_limiter.set_redis_client(app.state.redis)
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("API сервер останавливается...")
+    await app.state.redis.aclose()
+    await app.state.redis_pool.disconnect()
+    app.state.executor.shutdown(wait=False)
+    shutdown_image_pool()
+    await close_http_client()
+
+def _copy_to_fd(src, fd: int) -> None:
+    """Копирует загруженный файл в открытый дескриптор, дескриптор остается открытым"""
+    with os.fdopen(fd, "wb", buffering=UPLOAD_BUFFER_SIZE, closefd=False) as dst:
+        shutil.copyfileobj(src, dst, UPLOAD_CHUNK_SIZE)
+
+def _rm(*paths) -> None:
+    """Удаляет временные файлы, уже удаленные пропускает"""
+    for path in paths:
+        if path:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+def _open_tmpfile(suffix: str) -> Tuple[int, str, bool]:
+    """
+    Создает временный файл для загрузки
+    
+    На Linux это безымянный файл O_TMPFILE, который исчезает при закрытии
+    дескриптора, без отдельного unlink. Иначе обычный mkstemp.
+    Возвращает (дескриптор, путь, нужно ли удалять файл по пути).
+    """
+    if hasattr(os, "O_TMPFILE"):
+        try:
+            fd = os.open(tempfile.gettempdir(), os.O_TMPFILE | os.O_RDWR, 0o600)
+            return fd, f"/proc/self/fd/{fd}", False
+        except OSError:
+            # Файловая система не поддерживает O_TMPFILE
+            pass
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    return fd, path, True
+
+def _upload_suffix(image: UploadFile) -> str:
+    """Возвращает расширение загрузки, неподдерживаемые отклоняет с 400"""
+    suffix = os.path.splitext(image.filename or "")[1].lower()
+    if suffix.lstrip('.') not in SUPPORTED_IMAGE_FORMATS_SET:
+        raise HTTPException(status_code=400, detail="Неподдерживаемый формат изображения")
+    return suffix
+
+@asynccontextmanager
+async def _processed_image(image: UploadFile) -> AsyncIterator[Union[bytes, str]]:
+    """Обработанное изображение: bytes для небольших загрузок, иначе путь к временному файлу"""
+    suffix = _upload_suffix(image)
+    if image.size is not None and image.size <= MAX_INMEM_UPLOAD:
+        data = await image.read()
+        yield await asyncio.to_thread(ImageProcessor.process_image_bytes, data)
+        return
+    
+    # Открытие и удаление файлов - единичные системные вызовы, дешевле
+    # переключения на поток; в пул уходят только копирование и обработка
+    fd, temp_path, named = _open_tmpfile(suffix)
+    processed_image_path = None
+    try:
+        await asyncio.to_thread(_copy_to_fd, image.file, fd)
+        processed_image_path = await asyncio.to_thread(
+            ImageProcessor.process_image, temp_path, None, suffix
+        )
+        yield processed_image_path
+    finally:
+        # Дескриптор закрывается, даже если удаление файлов упадет
+        try:
+            _rm(temp_path if named else None, processed_image_path)
+        finally:
+            os.close(fd)
+
+# Временная метка для health check пересчитывается не чаще раза в секунду
+_TS_CACHE = [0, ""]
+
+def _now_iso() -> str:
+    """Текущее время UTC в ISO 8601 с точностью до секунды"""
+    t = int(time.time())
+    if t != _TS_CACHE[0]:
+        _TS_CACHE[0] = t
+        _TS_CACHE[1] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(t))
+    return _TS_CACHE[1]
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     return HealthResponse(
         status="healthy",
         version="1.0.0",
-        timestamp=datetime.now().isoformat()
+        timestamp=_now_iso()
     )
 
 @app.post("/generate", response_model=GenerateResponse)
@@ -69,96 +187,87 @@ async def generate_content(
             if not image:
                 raise HTTPException(status_code=400, detail="Изображение обязательно для типа 'image_only'")
             
-            temp_file = None
-            try:
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{image.filename.split('.')[-1]}")
-                content = await image.read()
-                temp_file.write(content)
-                temp_file.close()
-                
-                processed_image_path = ImageProcessor.process_image(temp_file.name)
-                content = await content_generator.generate_from_image(processed_image_path)
-                
-            finally:
-                if temp_file and os.path.exists(temp_file.name):
-                    os.unlink(temp_file.name)
-                if 'processed_image_path' in locals() and os.path.exists(processed_image_path):
-                    os.unlink(processed_image_path)
+            async with _processed_image(image) as processed_image:
+                content = await content_generator.generate_from_image(processed_image)
             
         elif type == ContentType.BOTH:
             if not image or not text:
                 raise HTTPException(status_code=400, detail="Изображение и текст обязательны для типа 'both'")
             
-            temp_file = None
-            try:
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{image.filename.split('.')[-1]}")
-                content = await image.read()
-                temp_file.write(content)
-                temp_file.close()
-                
-                processed_image_path = ImageProcessor.process_image(temp_file.name)
-                content = await content_generator.generate_from_both(processed_image_path, text)
-                
-            finally:
-                if temp_file and os.path.exists(temp_file.name):
-                    os.unlink(temp_file.name)
-                if 'processed_image_path' in locals() and os.path.exists(processed_image_path):
-                    os.unlink(processed_image_path)
+            async with _processed_image(image) as processed_image:
+                content = await content_generator.generate_from_both(processed_image, text)
         
         logger.info("Контент успешно сгенерирован")
-        return GenerateResponse(**content)
+        # Структура уже проверена validate_content_structure, а response_model
+        # все равно валидирует ответ, поэтому второй проход здесь не нужен
+        return GenerateResponse.model_construct(**content)
         
     except HTTPException:
         raise
-    except Exception as e:
-        logger.error(f"Ошибка при генерации контента: {e}")
+    # Ожидаемые сбои генерации и обработки файлов; остальное ловит общий обработчик
+    except (ContentGenerationError, FileProcessingError, ValueError, OSError) as e:
+        logger.error("Ошибка при генерации контента: %s", e)
         raise HTTPException(status_code=503, detail="Сервис генерации временно недоступен. Попробуйте позже.")
 
+# Тело ответа 500 в продакшн всегда одинаковое, сериализуем его один раз
+INTERNAL_ERROR_BODY = ErrorResponse(
+    error="Внутренняя ошибка сервера",
+    detail="Внутренняя ошибка сервера"
+).model_dump_json().encode()
+
 @app.exception_handler(ValidationError)
 async def validation_exception_handler(request, exc):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=422,
         content=ErrorResponse(
             error="Ошибка валидации",
             detail=str(exc)
-        ).dict()
+        ).model_dump()
     )
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
-    logger.error(f"Необработанное исключение: {exc}", exc_info=True)
+    logger.exception("Необработанное исключение: %s", exc)
     
     # Не показываем детали ошибок в продакшн
-    if API_DEBUG:
-        detail = str(exc)
-    else:
-        detail = "Внутренняя ошибка сервера"
+    if not API_DEBUG:
+        return Response(
+            status_code=500,
+            content=INTERNAL_ERROR_BODY,
+            media_type="application/json"
+        )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content=ErrorResponse(
             error="Внутренняя ошибка сервера",
-            detail=detail
-        ).dict()
+            detail=str(exc)
+        ).model_dump()
     )
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     logger.warning(f"HTTP Exception: {exc.status_code} - {exc.detail}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content=ErrorResponse(
             error="HTTP Error",
             detail=exc.detail
-        ).dict()
+        ).model_dump()
     )
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
     uvicorn.run(
         "api.main:app",
         host=API_HOST,
         port=API_PORT,
         reload=API_DEBUG,
-        log_level="info"
+        log_level="info",
+        # uvloop нет под Windows
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        # reload работает только с одним воркером
+        workers=1 if API_DEBUG else UVICORN_WORKERS
     )
@@ -8,15 +8,25 @@ logger = logging.getLogger(__name__)
 
 class LoggingMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        # scope["path"] - обычный dict, request.url собирает объект URL
+        path = request.scope["path"]
+        # Health check не логируем
+        if path == "/health":
+            return await call_next(request)
+        
         start_time = time.time()
-        logger.info(f"Входящий запрос: {request.method} {request.url.path} от {request.client.host if request.client else 'unknown'}")
+        logger.info("Входящий запрос: %s %s от %s", request.method, path, request.client.host if request.client else 'unknown')
         
         try:
             response = await call_next(request)
             process_time = time.time() - start_time
-            logger.info(f"Ответ: {response.status_code} время обработки: {process_time:.3f}с размер: {len(response.body) if hasattr(response, 'body') else 'unknown'} байт")
+            # call_next всегда возвращает потоковый ответ: размер берем из заголовка,
+            # без него ответ отдается потоком
+            if logger.isEnabledFor(logging.INFO):
+                size = response.headers.get('content-length') or 'stream'
+                logger.info("Ответ: %s время обработки: %.3fс размер: %s байт", response.status_code, process_time, size)
             return response
         except Exception as e:
             process_time = time.time() - start_time
-            logger.error(f"Ошибка обработки запроса: {request.method} {request.url.path} время: {process_time:.3f}с, ошибка: {e}")
+            logger.error("Ошибка обработки запроса: %s %s время: %.3fс, ошибка: %s", request.method, path, process_time, e)
             raise 
\ No newline at end of file
@@ -3,61 +3,159 @@ Rate Limiting Middleware для API
 """
 import time
 import logging
+from collections import OrderedDict
 from typing import Dict, Tuple
 from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import redis.asyncio as redis
-import os
+
+from api.config import REDIS_URL, REDIS_MAX_CONNECTIONS
 
 logger = logging.getLogger(__name__)
 
+# Проверка и увеличение обоих счетчиков на delta за один round-trip.
+# Возвращает 0 если запрос разрешен, иначе {1 - превышен минутный лимит,
+# 2 - часовой; секунд до конца окна этого лимита}.
+RATE_LIMIT_SCRIPT = """
+local limits = {tonumber(ARGV[1]), tonumber(ARGV[2])}
+local ttls = {tonumber(ARGV[3]), tonumber(ARGV[4])}
+local delta = tonumber(ARGV[5])
+for i = 1, 2 do
+    local count = tonumber(redis.call('GET', KEYS[i]) or '0')
+    if count + delta > limits[i] then
+        return {i, redis.call('TTL', KEYS[i])}
+    end
+end
+for i = 1, 2 do
+    if redis.call('INCRBY', KEYS[i], delta) == delta then
+        redis.call('EXPIRE', KEYS[i], ttls[i])
+    end
+end
+return 0
+"""
+
+# Локальный счетчик синхронизируется с Redis на каждом N-м запросе
+LOCAL_SYNC_EVERY = 10
+LOCAL_MAX_KEYS = 100_000
+
+class TokenBucket:
+    """Локальный token bucket на ключ: O(1) на запрос, ограниченный объем памяти"""
+
+    def __init__(self, rate_per_minute: int, max_keys: int = 100_000):
+        self.capacity = float(rate_per_minute)
+        self.refill_per_second = rate_per_minute / 60.0
+        self.max_keys = max_keys
+        # key -> (оставшиеся токены, время последнего обновления)
+        self.buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def allow(self, key: str) -> bool:
+        """Списывает токен для ключа, возвращает False если токенов нет"""
+        now = time.monotonic()
+        tokens, last_ts = self.buckets.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - last_ts) * self.refill_per_second)
+        allowed = tokens >= 1.0
+        if allowed:
+            tokens -= 1.0
+
+        self.buckets[key] = (tokens, now)
+        self.buckets.move_to_end(key)
+        if len(self.buckets) > self.max_keys:
+            # Вытесняем самый давно неактивный ключ
+            self.buckets.popitem(last=False)
+        return allowed
+
 class RateLimiter:
     def __init__(self):
-        self.redis_url = os.getenv("REDIS_URL", "redis://redis:6379")
+        self.redis_url = REDIS_URL
         self.redis_client = None
+        self.rate_limit_script = None
         self.rate_limit_per_minute = 60
         self.rate_limit_per_hour = 1000
+        # Используется, когда Redis недоступен
+        self.local_bucket = TokenBucket(self.rate_limit_per_minute)
+        # ip -> (номер минуты, запросов за минуту, из них учтено в Redis)
+        self.local_counts: "OrderedDict[str, Tuple[int, int, int]]" = OrderedDict()
+        # ip -> time.monotonic() конца окна, лимит которого Redis счел превышенным
+        self.blocked_until: "OrderedDict[str, float]" = OrderedDict()
         
+    def set_redis_client(self, redis_client) -> None:
+        """Использует общий клиент, созданный при старте приложения"""
+        self.redis_client = redis_client
+        # Script сам использует EVALSHA и перезагружает скрипт при NOSCRIPT
+        self.rate_limit_script = redis_client.register_script(RATE_LIMIT_SCRIPT)
+    
     async def get_redis_client(self):
         if self.redis_client is None:
-            self.redis_client = redis.from_url(self.redis_url, decode_responses=True)
+            self.set_redis_client(redis.from_url(
+                self.redis_url,
+                decode_responses=True,
+                max_connections=REDIS_MAX_CONNECTIONS
+            ))
         return self.redis_client
     
+    def _store_local_count(self, client_ip: str, entry: Tuple[int, int, int]) -> None:
+        self.local_counts[client_ip] = entry
+        self.local_counts.move_to_end(client_ip)
+        if len(self.local_counts) > LOCAL_MAX_KEYS:
+            self.local_counts.popitem(last=False)
+    
+    def _block(self, client_ip: str, seconds: int) -> None:
+        self.blocked_until[client_ip] = time.monotonic() + max(seconds, 1)
+        self.blocked_until.move_to_end(client_ip)
+        if len(self.blocked_until) > LOCAL_MAX_KEYS:
+            self.blocked_until.popitem(last=False)
+    
     async def check_rate_limit(self, client_ip: str) -> bool:
         """Проверяет rate limit для IP адреса"""
+        # Превысившему лимит IP отказываем локально до конца окна: иначе
+        # быстрый путь ниже пропускал бы большинство его запросов
+        until = self.blocked_until.get(client_ip)
+        if until is not None:
+            if time.monotonic() < until:
+                return False
+            del self.blocked_until[client_ip]
+        
+        # Пока IP далеко от минутного лимита, считаем запросы локально
+        # и обращаемся к Redis только на каждом LOCAL_SYNC_EVERY-м запросе
+        minute = int(time.time() // 60)
+        bucket, count, synced = self.local_counts.get(client_ip, (minute, 0, 0))
+        if bucket != minute:
+            count, synced = 0, 0
+        count += 1
+        
+        if count % LOCAL_SYNC_EVERY and count <= self.rate_limit_per_minute // 2:
+            self._store_local_count(client_ip, (minute, count, synced))
+            return True
+        
         try:
-            redis_client = await self.get_redis_client()
+            await self.get_redis_client()
             
-            # Проверяем лимит в минуту
             minute_key = f"rate_limit:minute:{client_ip}"
-            minute_count = await redis_client.get(minute_key)
-            
-            if minute_count and int(minute_count) >= self.rate_limit_per_minute:
-                logger.warning(f"Rate limit exceeded for IP {client_ip} (per minute)")
-                return False
-            
-            # Проверяем лимит в час
             hour_key = f"rate_limit:hour:{client_ip}"
-            hour_count = await redis_client.get(hour_key)
+            exceeded = await self.rate_limit_script(
+                keys=[minute_key, hour_key],
+                args=[self.rate_limit_per_minute, self.rate_limit_per_hour, 60, 3600, count - synced]
+            )
             
-            if hour_count and int(hour_count) >= self.rate_limit_per_hour:
-                logger.warning(f"Rate limit exceeded for IP {client_ip} (per hour)")
+            if exceeded:
+                # Отклоненный запрос не учитываем
+                self._store_local_count(client_ip, (minute, count - 1, synced))
+                limit, ttl = exceeded
+                self._block(client_ip, int(ttl))
+                period = "per minute" if int(limit) == 1 else "per hour"
+                logger.warning("Rate limit exceeded for IP %s (%s)", client_ip, period)
                 return False
             
-            # Увеличиваем счетчики
-            pipe = redis_client.pipeline()
-            pipe.incr(minute_key)
-            pipe.expire(minute_key, 60)  # TTL 60 секунд
-            pipe.incr(hour_key)
-            pipe.expire(hour_key, 3600)  # TTL 1 час
-            await pipe.execute()
-            
+            self._store_local_count(client_ip, (minute, count, count))
             return True
             
         except Exception as e:
-            logger.error(f"Error in rate limiting: {e}")
-            # В случае ошибки Redis разрешаем запрос
-            return True
+            logger.error("Error in rate limiting: %s", e)
+            # Неучтенные запросы уйдут в Redis при следующей синхронизации,
+            # а до нее снова работает локальный счет
+            self._store_local_count(client_ip, (minute, count, synced))
+            # В случае ошибки Redis ограничиваем запросы локально в процессе
+            return self.local_bucket.allow(client_ip)
     
     async def get_client_ip(self, request: Request) -> str:
         """Получает реальный IP клиента"""
@@ -77,16 +175,16 @@ rate_limiter = RateLimiter()
 
 async def rate_limit_middleware(request: Request, call_next):
     """Middleware для rate limiting"""
+    # Пропускаем health check
+    if request.scope["path"] == "/health":
+        return await call_next(request)
+    
     try:
         client_ip = await rate_limiter.get_client_ip(request)
         
-        # Пропускаем health check
-        if request.url.path == "/health":
-            return await call_next(request)
-        
         # Проверяем rate limit
         if not await rate_limiter.check_rate_limit(client_ip):
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=429,
                 content={
                     "error": "Rate limit exceeded",
@@ -99,6 +197,6 @@ async def rate_limit_middleware(request: Request, call_next):
         return response
         
     except Exception as e:
-        logger.error(f"Error in rate limit middleware: {e}")
+        logger.error("Error in rate limit middleware: %s", e)
         # В случае ошибки пропускаем запрос
         return await call_next(request)
@@ -7,7 +7,7 @@ OpenAI API or fallback methods.
 
 import logging
 import asyncio
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
 
 from api.services.openai_service import OpenAIService
 from api.utils.text_processor import (
@@ -39,14 +39,14 @@ class ContentGeneratorService:
             logger.warning(f"Failed to initialize OpenAI service: {e}")
             self.use_openai = False
     
-    async def generate_from_image(self, image_path: str) -> Dict[str, Any]:
+    async def generate_from_image(self, image_path: Union[str, bytes]) -> Dict[str, Any]:
         """
         Generate content from image analysis.
         
         Parameters
         ----------
-        image_path : str
-            Path to the image file to analyze.
+        image_path : str or bytes
+            Path to the image file to analyze, or its raw bytes.
             
         Returns
         -------
@@ -54,7 +54,7 @@ class ContentGeneratorService:
             Generated content including title, descriptions, features,
             SEO keywords, and target audience.
         """
-        logger.info(f"Generating content from image: {image_path}")
+        logger.info(f"Generating content from image: {OpenAIService._describe_image(image_path)}")
         
         if not (self.use_openai and self.openai_service):
             raise ContentGenerationError("OpenAI service not available")
@@ -87,14 +87,14 @@ class ContentGeneratorService:
         validate_content_structure(content)
         return format_content_for_response(content)
     
-    async def generate_from_both(self, image_path: str, text: str) -> Dict[str, Any]:
+    async def generate_from_both(self, image_path: Union[str, bytes], text: str) -> Dict[str, Any]:
         """
         Generate content from both image and text.
         
         Parameters
         ----------
-        image_path : str
-            Path to the image file to analyze.
+        image_path : str or bytes
+            Path to the image file to analyze, or its raw bytes.
         text : str
             Text description of the product.
             
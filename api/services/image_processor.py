@@ -4,6 +4,7 @@
 import logging
 import os
 import tempfile
+from io import BytesIO
 from typing import Optional
 from PIL import Image
 from shared.constants import SUPPORTED_IMAGE_FORMATS, MAX_FILE_SIZE
@@ -11,16 +12,24 @@ from shared.exceptions import FileProcessingError, ValidationError
 
 logger = logging.getLogger(__name__)
 
+# Результат временный (уходит в OpenAI и удаляется), поэтому без второго
+# прохода Хаффмана и с 4:2:0 цветностью; остальные форматы эти ключи игнорируют
+SAVE_OPTIONS = {'quality': 85, 'optimize': False, 'progressive': False, 'subsampling': 2}
+
 class ImageProcessor:
     """Сервис для обработки изображений"""
     
     @staticmethod
-    def validate_image(file_path: str) -> bool:
+    def validate_image(file_path: str, extension: Optional[str] = None) -> bool:
         """
         Валидирует изображение
         
+        Синхронный: stat и чтение заголовка дешевле переключения на поток,
+        поэтому вызывается напрямую, без run_in_executor
+        
         Args:
             file_path: Путь к файлу изображения
+            extension: Расширение файла, если в пути его нет
             
         Returns:
             True если изображение валидно
@@ -29,15 +38,7 @@ class ImageProcessor:
             ValidationError: Если изображение невалидно
         """
         try:
-            # Проверяем размер файла
-            file_size = os.path.getsize(file_path)
-            if file_size > MAX_FILE_SIZE:
-                raise ValidationError(f"Размер файла превышает лимит: {file_size} > {MAX_FILE_SIZE}")
-            
-            # Проверяем формат файла
-            file_extension = os.path.splitext(file_path)[1].lower().lstrip('.')
-            if file_extension not in SUPPORTED_IMAGE_FORMATS:
-                raise ValidationError(f"Неподдерживаемый формат файла: {file_extension}")
+            ImageProcessor._validate_metadata(file_path, extension)
             
             # Проверяем, что файл является валидным изображением
             with Image.open(file_path) as img:
@@ -51,40 +52,51 @@ class ImageProcessor:
             raise ValidationError(f"Ошибка валидации изображения: {e}")
     
     @staticmethod
-    def process_image(file_path: str, output_path: Optional[str] = None) -> str:
+    def _validate_metadata(file_path: str, extension: Optional[str] = None) -> None:
+        """Проверяет размер и расширение файла, не декодируя изображение"""
+        # Проверяем размер файла: один stat, отсутствие файла - ошибка валидации
+        try:
+            file_size = os.stat(file_path).st_size
+        except FileNotFoundError:
+            raise ValidationError(f"Файл не найден: {file_path}")
+        if file_size > MAX_FILE_SIZE:
+            raise ValidationError(f"Размер файла превышает лимит: {file_size} > {MAX_FILE_SIZE}")
+        
+        # Проверяем формат файла
+        file_extension = (extension or os.path.splitext(file_path)[1]).lower().lstrip('.')
+        if file_extension not in SUPPORTED_IMAGE_FORMATS:
+            raise ValidationError(f"Неподдерживаемый формат файла: {file_extension}")
+    
+    @staticmethod
+    def process_image(file_path: str, output_path: Optional[str] = None,
+                      extension: Optional[str] = None) -> str:
         """
         Обрабатывает изображение (изменение размера, оптимизация)
         
         Args:
             file_path: Путь к исходному изображению
             output_path: Путь для сохранения обработанного изображения
+            extension: Расширение файла, если в пути его нет (например, /proc/self/fd/N)
             
         Returns:
             Путь к обработанному изображению
         """
         try:
-            # Валидируем изображение
-            ImageProcessor.validate_image(file_path)
+            # Проверяем размер и формат; целостность проверяется при декодировании ниже
+            ImageProcessor._validate_metadata(file_path, extension)
             
-            # Если output_path не указан, создаем временный файл
+            # Если output_path не указан, создаем временный файл с уникальным именем
             if not output_path:
-                temp_dir = tempfile.gettempdir()
-                file_name = os.path.basename(file_path)
-                output_path = os.path.join(temp_dir, f"processed_{file_name}")
+                suffix = extension or os.path.splitext(file_path)[1]
+                fd, output_path = tempfile.mkstemp(prefix="processed_", suffix=suffix)
+                os.close(fd)
             
             # Открываем и обрабатываем изображение
             with Image.open(file_path) as img:
-                # Конвертируем в RGB если нужно
-                if img.mode not in ('RGB', 'RGBA'):
-                    img = img.convert('RGB')
-                
-                # Изменяем размер если изображение слишком большое
-                max_size = (1920, 1920)
-                if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-                    img.thumbnail(max_size, Image.Resampling.LANCZOS)
+                img = ImageProcessor._prepare(img)
                 
                 # Сохраняем обработанное изображение
-                img.save(output_path, quality=85, optimize=True)
+                img.save(output_path, **SAVE_OPTIONS)
             
             logger.info(f"Изображение обработано: {file_path} -> {output_path}")
             return output_path
@@ -93,11 +105,67 @@ class ImageProcessor:
             logger.error(f"Ошибка при обработке изображения {file_path}: {e}")
             raise FileProcessingError(f"Ошибка обработки изображения: {e}")
     
+    @staticmethod
+    def process_image_bytes(data: bytes) -> bytes:
+        """
+        Обрабатывает изображение в памяти, без временных файлов
+        
+        Args:
+            data: Содержимое файла изображения
+            
+        Returns:
+            Обработанное изображение в исходном формате
+        """
+        try:
+            if len(data) > MAX_FILE_SIZE:
+                raise ValidationError(f"Размер файла превышает лимит: {len(data)} > {MAX_FILE_SIZE}")
+            
+            with Image.open(BytesIO(data)) as img:
+                image_format = img.format
+                img = ImageProcessor._prepare(img)
+                
+                output = BytesIO()
+                img.save(output, format=image_format, **SAVE_OPTIONS)
+            
+            logger.info(f"Изображение обработано в памяти: {len(data)} -> {output.tell()} байт")
+            return output.getvalue()
+            
+        except Exception as e:
+            logger.error(f"Ошибка при обработке изображения в памяти: {e}")
+            raise FileProcessingError(f"Ошибка обработки изображения: {e}")
+    
+    @staticmethod
+    def _prepare(img: Image.Image) -> Image.Image:
+        """Приводит цветовой режим и уменьшает слишком большие изображения"""
+        max_size = (1920, 1920)
+        
+        # JPEG сразу декодируем в уменьшенном масштабе (1/2, 1/4, 1/8)
+        if img.format == "JPEG":
+            img.draft(img.mode, max_size)
+        
+        # Единственное декодирование; заодно проверяет, что файл не поврежден
+        try:
+            img.load()
+        except (OSError, SyntaxError) as e:
+            raise ValidationError(f"Поврежденное изображение: {e}")
+        
+        # Конвертируем в RGB если нужно
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGB')
+        
+        # Изменяем размер если изображение слишком большое
+        if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
+            img.thumbnail(max_size, Image.Resampling.LANCZOS)
+        
+        return img
+    
     @staticmethod
     def extract_image_info(file_path: str) -> dict:
         """
         Извлекает информацию об изображении
         
+        Синхронный: читает только заголовок, вызывается напрямую из async-кода
+        
         Args:
             file_path: Путь к изображению
             
@@ -146,6 +214,10 @@ class ImageProcessor:
             
             # Создаем миниатюру
             with Image.open(file_path) as img:
+                # JPEG сразу декодируем в уменьшенном масштабе
+                if img.format == "JPEG":
+                    img.draft(img.mode, size)
+                
                 # Конвертируем в RGB если нужно
                 if img.mode not in ('RGB', 'RGBA'):
                     img = img.convert('RGB')
@@ -154,7 +226,7 @@ class ImageProcessor:
                 img.thumbnail(size, Image.Resampling.LANCZOS)
                 
                 # Сохраняем миниатюру
-                img.save(thumbnail_path, quality=85, optimize=True)
+                img.save(thumbnail_path, **SAVE_OPTIONS)
             
             logger.info(f"Миниатюра создана: {thumbnail_path}")
             return thumbnail_path
@@ -168,13 +240,18 @@ class ImageProcessor:
         """
         Удаляет временные файлы
         
+        Синхронный: unlink - один системный вызов на файл, пул потоков не нужен
+        
         Args:
             *file_paths: Пути к файлам для удаления
         """
         for file_path in file_paths:
+            if not file_path:
+                continue
             try:
-                if file_path and os.path.exists(file_path):
-                    os.remove(file_path)
-                    logger.debug(f"Временный файл удален: {file_path}")
+                os.remove(file_path)
+                logger.debug(f"Временный файл удален: {file_path}")
+            except FileNotFoundError:
+                pass
             except Exception as e:
                 logger.warning(f"Не удалось удалить временный файл {file_path}: {e}") 
\ No newline at end of file
@@ -6,23 +6,254 @@ GPT-5 Responses API. It supports image analysis, text processing, and
 combined image-text analysis (via base64-embedded images).
 """
 
-import base64
+import asyncio
+import hashlib
 import json
 import logging
+import multiprocessing
 import os
-import time
+import re
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
 
+import ahocorasick
+import httpx
+from cachetools import TTLCache
+import numpy as np
 import openai
-import requests
+import orjson
+import pybase64
+import simplejpeg
 from PIL import Image
 
+from api.config import CACHE_TTL, UVICORN_WORKERS
+from api.utils.prompts import IMAGE_ANALYSIS_PROMPT, TEXT_PROCESSING_PROMPT, COMBINED_PROCESSING_PROMPT
 from shared.exceptions import ContentGenerationError
 
 logger = logging.getLogger(__name__)
 
 
+def _build_automaton(patterns) -> "ahocorasick.Automaton":
+    """Compile lowercase substrings into one Aho-Corasick matcher."""
+    automaton = ahocorasick.Automaton()
+    for pattern in patterns:
+        automaton.add_word(pattern, pattern)
+    automaton.make_automaton()
+    return automaton
+
+
+def _contains_any(automaton: "ahocorasick.Automaton", text: str) -> bool:
+    """Return True if ``text`` contains any pattern of ``automaton``."""
+    return next(automaton.iter(text), None) is not None
+
+
+def _clean_list(seq) -> list:
+    """Strip items of a JSON list, dropping empty ones; str() only non-strings."""
+    out = []
+    for item in (seq or ()):
+        item = item.strip() if isinstance(item, str) else str(item).strip()
+        if item:
+            out.append(item)
+    return out
+
+
+# (field, minimum length, default) for _fill_defaults; a None default means
+# "copy short_description". JSON answers only get empty fields filled, the
+# textual fallback also replaces values that are too short to be useful.
+_JSON_DEFAULTS = (
+    ('title', 1, "Товар"),
+    ('short_description', 1, "Стильный и функциональный товар"),
+    ('full_description', 1, None),
+    ('features', 1, ("Высокое качество", "Стильный дизайн")),
+    ('seo_keywords', 1, ("описание товара", "характеристики")),
+    ('target_audience', 1, ("Покупатели", "Потребители")),
+)
+_TEXT_DEFAULTS = (
+    ('title', 5, "Товар - Качественное решение"),
+    ('short_description', 10, "Стильный и функциональный товар"),
+    ('full_description', 20, None),
+    ('features', 2, ("Высокое качество", "Стильный дизайн")),
+    ('seo_keywords', 2, ("качественный", "стильный")),
+    ('target_audience', 2, ("Потребители", "Покупатели")),
+)
+
+
+def _fill_defaults(content: Dict[str, Any], defaults, short_from_full: bool = False) -> Dict[str, Any]:
+    """
+    Replace missing or too short fields of ``content`` in place.
+    
+    Parameters
+    ----------
+    content : Dict[str, Any]
+        Parsed content with all six fields present.
+    defaults : tuple
+        ``(field, min_length, default)`` triples, applied in order.
+    short_from_full : bool, optional
+        Derive a missing short description from the full one first.
+        
+    Returns
+    -------
+    Dict[str, Any]
+        The same ``content`` dictionary.
+    """
+    for field, min_length, default in defaults:
+        if len(content[field]) >= min_length:
+            continue
+        if default is None:
+            content[field] = content['short_description']
+        elif field == 'short_description' and short_from_full:
+            content[field] = content['full_description'][:120] or default
+        else:
+            content[field] = list(default) if isinstance(default, tuple) else default
+    return content
+
+
+# Phrases that mark a refusal or error instead of product content;
+# each text is lowercased once and scanned once for all of them. A
+# case-insensitive regex alternation would skip the lower() copy but is
+# far slower than lower() plus one automaton pass.
+ERROR_PATTERNS = (
+    'sorry', 'извините', 'error', 'ошибка', 'не могу', 'cannot',
+    'unable', 'не удается', 'не понимаю', 'don\'t understand'
+)
+QUALITY_ERROR_PATTERNS = ERROR_PATTERNS + ('i cannot', 'я не могу', 'не удалось', 'failed')
+_PARSE_ERROR_PATTERNS = _build_automaton(ERROR_PATTERNS)
+_QUALITY_ERROR_PATTERNS = _build_automaton(QUALITY_ERROR_PATTERNS)
+_PRODUCT_WORDS = _build_automaton(['товар', 'продукт', 'изделие', 'предмет', 'характеристики', 'описание'])
+
+# Finds the end of an embedded JSON object in C instead of a Python loop
+_JSON_DECODER = json.JSONDecoder()
+
+# Lines of the textual fallback format, scanned over the whole response in
+# one finditer pass. Each match starts at a non-blank line, captures the
+# stripped line into `line` and ends with the group naming its kind, so
+# `lastgroup` is the section. Section lookaheads scan the whole line, so a
+# keyword anywhere in the line selects the section and earlier sections
+# win, as in the original chain of `in` checks; other lines are `text`.
+_SECTION_RE = re.compile(
+    r"^[^\S\n]*(?=(?P<line>[^\n]*\S))(?:"
+    r"(?=[^\n]*?(?:название|title))(?P<title>)"
+    r"|(?=[^\n]*?(?:краткое описание|short description))(?P<short_description>)"
+    r"|(?=[^\n]*?(?:полное описание|full description))(?P<full_description>)"
+    r"|(?=[^\n]*?(?:характеристики|features))(?P<features>)"
+    r"|(?=[^\n]*?(?:seo|ключевые слова))(?P<seo_keywords>)"
+    r"|(?=[^\n]*?(?:аудитория|target audience))(?P<target_audience>)"
+    r"|(?P<item>(?=[-•]))"
+    r"|(?P<text>))",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Brackets and quotes removed from an SEO keywords line in one translate() pass
+_KEYWORD_STRIP_CHARS = str.maketrans('', '', '[]"\'')
+
+# Vision API downsamples to at most 2048x768 anyway; larger pixels only cost
+# bytes and image tokens. The long side is capped lower by default.
+VISION_MAX_LONG_SIDE = int(os.getenv('OPENAI_IMAGE_MAX_SIDE', '1024'))
+VISION_MAX_SHORT_SIDE = min(768, VISION_MAX_LONG_SIDE)
+# JPEGs up to this size that already fit the bounds are sent without re-encoding
+JPEG_PASSTHROUGH_MAX_BYTES = 4 * 1024 * 1024
+# Worker processes for image decode/resize/encode per uvicorn worker, so the
+# whole host gets about one per core; 0 keeps it in-process
+OPENAI_IMAGE_WORKERS = int(os.getenv(
+    'OPENAI_IMAGE_WORKERS', str(max(1, (os.cpu_count() or 1) // UVICORN_WORKERS))
+))
+
+# Outbound HTTP pool shared by every service instance
+HTTP_MAX_CONNECTIONS = 1000
+HTTP_MAX_KEEPALIVE = 100
+# Model responses kept per process for repeated identical requests
+RESPONSE_CACHE_SIZE = 1024
+# Title of the placeholder content returned when the reply is unusable
+_FALLBACK_TITLE = 'Временная заглушка'
+
+_IMAGE_POOL: Optional[ProcessPoolExecutor] = None
+_HTTP_CLIENT: Optional[httpx.AsyncClient] = None
+# Request digest -> raw model response that parsed, see OpenAIService._generate
+_RESPONSE_CACHE: "TTLCache[str, str]" = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=CACHE_TTL)
+
+
+def start_image_pool() -> None:
+    """
+    Start the image worker processes, unless disabled.
+    
+    Called once at application startup. Workers come from a forkserver:
+    forking the server itself, which already runs executor threads, could
+    copy a lock held by another thread and deadlock the child.
+    
+    Such a pool only spawns a worker when a task is submitted, so one
+    no-op task per worker starts them (and imports this module in them)
+    now instead of on the first requests.
+    """
+    global _IMAGE_POOL
+    if _IMAGE_POOL is None and OPENAI_IMAGE_WORKERS > 0:
+        _IMAGE_POOL = ProcessPoolExecutor(
+            max_workers=OPENAI_IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+        for _ in range(OPENAI_IMAGE_WORKERS):
+            _IMAGE_POOL.submit(_warm_up)
+
+
+def shutdown_image_pool() -> None:
+    """Stop the image worker processes, if they were started."""
+    global _IMAGE_POOL
+    if _IMAGE_POOL is not None:
+        _IMAGE_POOL.shutdown(wait=False, cancel_futures=True)
+        _IMAGE_POOL = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Return the shared async HTTP client, creating it on first use."""
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None or _HTTP_CLIENT.is_closed:
+        _HTTP_CLIENT = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            ),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            http2=True,
+        )
+    return _HTTP_CLIENT
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client, if it was created."""
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is not None:
+        await _HTTP_CLIENT.aclose()
+        _HTTP_CLIENT = None
+
+
+def _split_prompt(template: str) -> Tuple[str, str, str]:
+    """
+    Split a prompt template into a static system part and a user line.
+    
+    The line holding the ``{text}`` placeholder is cut out of the
+    template; everything else never changes between calls, so it is
+    sent as the system message and stays a cacheable prompt prefix.
+    
+    Parameters
+    ----------
+    template : str
+        Prompt with a single ``{text}`` placeholder.
+        
+    Returns
+    -------
+    Tuple[str, str, str]
+        System prompt, and the text before and after ``{text}`` on the
+        placeholder line.
+    """
+    head, _, tail = template.partition("{text}")
+    line_start = head.rfind("\n") + 1
+    line_end = tail.find("\n")
+    if line_end == -1:
+        line_end = len(tail)
+    system_prompt = head[:line_start] + tail[line_end + 1:]
+    return system_prompt, head[line_start:], tail[:line_end]
+
+
 class OpenAIService:
     """
     Service for interacting with OpenAI API for content generation.
@@ -36,34 +267,42 @@ class OpenAIService:
         self.api_key = os.getenv('OPENAI_API_KEY')
         self.model = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
         self.max_tokens = int(os.getenv('OPENAI_MAX_TOKENS', '1000'))
+        # Upper bound on in-flight API calls, tuned to the account's RPM/TPM limits
+        self.max_concurrency = int(os.getenv('OPENAI_MAX_CONCURRENCY', '20'))
 
         if not self.api_key:
             raise ContentGenerationError("OpenAI API key not configured")
 
-        # Create OpenAI client with explicit http_client to avoid proxy issues
-        import httpx
-        http_client = httpx.AsyncClient()
-        self.client = openai.AsyncOpenAI(api_key=self.api_key, http_client=http_client)
+        # Create OpenAI client with explicit http_client to avoid proxy issues.
+        # The client is a process-wide singleton, so every service instance
+        # shares one pool. Retries are done in _call_openai_api, not in the SDK.
+        self.client = openai.AsyncOpenAI(api_key=self.api_key, http_client=_get_http_client(), max_retries=0)
+        self._sem = asyncio.Semaphore(self.max_concurrency)
 
-        # Import prompts from utils с обработкой ошибок
-        try:
-            from api.utils.prompts import IMAGE_ANALYSIS_PROMPT, TEXT_PROCESSING_PROMPT, COMBINED_PROCESSING_PROMPT
-            self._image_prompt = IMAGE_ANALYSIS_PROMPT
-            self._text_prompt = TEXT_PROCESSING_PROMPT
-            self._combined_prompt = COMBINED_PROCESSING_PROMPT
-            logger.debug(f"Combined prompt loaded successfully, length: {len(self._combined_prompt)}")
-        except Exception as e:
-            logger.error(f"Error loading prompts: {e}")
-            raise ContentGenerationError(f"Failed to load prompts: {e}")
+        # Prompts are module-level constants, imported once with the module
+        self._image_prompt = IMAGE_ANALYSIS_PROMPT
+        self._text_prompt = TEXT_PROCESSING_PROMPT
+        self._combined_prompt = COMBINED_PROCESSING_PROMPT
+        # A missing placeholder is a programming error: fail at startup,
+        # not on every request
+        for name, prompt in (("text", self._text_prompt), ("combined", self._combined_prompt)):
+            if "{text}" not in prompt:
+                raise ContentGenerationError(f"Invalid {name} prompt: missing {{text}} placeholder")
+        # Static instructions go to the system message so the provider can
+        # reuse the cached prompt prefix; only the {text} line is per call
+        self._text_system, self._text_prefix, self._text_suffix = _split_prompt(self._text_prompt)
+        self._combined_system, self._combined_prefix, self._combined_suffix = _split_prompt(
+            self._combined_prompt
+        )
     
-    async def generate_from_image(self, image_path: str) -> Dict[str, Any]:
+    async def generate_from_image(self, image_path: Union[str, bytes]) -> Dict[str, Any]:
         """
         Generate product content from image analysis.
         
         Parameters
         ----------
-        image_path : str
-            Path to the image file to analyze.
+        image_path : str or bytes
+            Path to the image file to analyze, or its raw bytes.
             
         Returns
         -------
@@ -77,22 +316,16 @@ class OpenAIService:
             If image processing or API call fails.
         """
         try:
-            logger.info(f"Generating content from image: {image_path}")
-            
-            # Load and process image
-            image = self._load_image(image_path)
+            logger.info(f"Generating content from image: {self._describe_image(image_path)}")
             
-            # Use base64 encoding instead of imgbb
-            base64_image = self._encode_image_to_base64(image)
+            # Remote URL as is, otherwise the image encoded once into a data URL
+            image_url = await self._image_url(image_path)
             
-            # Generate content using OpenAI
-            response = await self._call_openai_api(
-                prompt=self._image_prompt,
-                image_url=f"data:image/jpeg;base64,{base64_image}"
+            # Generate content using OpenAI, parsed and validated
+            content = await self._generate(
+                system_prompt=self._image_prompt,
+                image_url=image_url
             )
-            
-            # Parse and validate response
-            content = self._parse_response(response)
             logger.info("Content generated successfully from image")
             
             return content
@@ -124,14 +357,14 @@ class OpenAIService:
         try:
             logger.info(f"Generating content from text: {text[:50]}...")
             
-            # Prepare prompt with user text (безопасная замена)
-            prompt = self._text_prompt.replace("{text}", text)
-            
-            # Generate content using OpenAI
-            response = await self._call_openai_api(prompt=prompt)
+            # Prepare user message with user text (безопасная замена)
+            user_text = f"{self._text_prefix}{text}{self._text_suffix}"
             
-            # Parse and validate response
-            content = self._parse_response(response)
+            # Generate content using OpenAI, parsed and validated
+            content = await self._generate(
+                system_prompt=self._text_system,
+                user_text=user_text
+            )
             logger.info("Content generated successfully from text")
             
             return content
@@ -140,14 +373,14 @@ class OpenAIService:
             logger.error(f"Error generating content from text: {e}")
             raise ContentGenerationError(f"Text processing failed: {e}")
     
-    async def generate_from_both(self, image_path: str, text: str) -> Dict[str, Any]:
+    async def generate_from_both(self, image_path: Union[str, bytes], text: str) -> Dict[str, Any]:
         """
         Generate product content from both image and text.
         
         Parameters
         ----------
-        image_path : str
-            Path to the image file to analyze.
+        image_path : str or bytes
+            Path to the image file to analyze, or its raw bytes.
         text : str
             Text description of the product.
             
@@ -165,33 +398,23 @@ class OpenAIService:
         try:
             logger.info(f"Generating content from image and text: {text[:50]}...")
             
-            # Load and process image
-            image = self._load_image(image_path)
-
-            # Prepare base64 image URL
-            base64_image = self._encode_image_to_base64(image)
+            # Remote URL as is, otherwise the image encoded once into a data URL
+            image_url = await self._image_url(image_path)
 
             # Prepare prompt with user text (безопасная замена)
-            logger.debug(f"Original combined prompt length: {len(self._combined_prompt)}")
-            logger.debug(f"User text to insert: {text}")
-            
-            if "{text}" not in self._combined_prompt:
-                logger.error("Placeholder {text} not found in combined prompt!")
-                raise ContentGenerationError("Invalid combined prompt: missing {text} placeholder")
+            logger.debug("Original combined prompt length: %d", len(self._combined_prompt))
+            logger.debug("User text to insert: %s", text)
             
-            prompt = self._combined_prompt.replace("{text}", text)
-            logger.debug(f"Combined prompt prepared, final length: {len(prompt)}")
-            logger.debug(f"Combined prompt preview: {prompt[:200]}...")
+            user_text = f"{self._combined_prefix}{text}{self._combined_suffix}"
+            logger.debug("Combined user message prepared, length: %d", len(user_text))
+            logger.debug("Combined user message preview: %.200s...", user_text)
             
-            # Generate content using OpenAI
-            response = await self._call_openai_api(
-                prompt=prompt,
-                image_url=f"data:image/jpeg;base64,{base64_image}"
+            # Generate content using OpenAI, parsed and validated
+            content = await self._generate(
+                system_prompt=self._combined_system,
+                user_text=user_text,
+                image_url=image_url
             )
-            
-            # Parse and validate response
-            logger.debug(f"Raw response from OpenAI: {response[:500]}...")
-            content = self._parse_response(response)
             logger.info("Content generated successfully from image and text")
             
             return content
@@ -202,14 +425,56 @@ class OpenAIService:
             logger.error(f"Exception traceback:", exc_info=True)
             raise ContentGenerationError(f"Combined analysis failed: {e}")
     
-    def _load_image(self, image_path: str) -> Image.Image:
+    async def generate_batch(
+        self, items: Sequence[Tuple[Optional[Union[str, bytes]], Optional[str]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate product content for many inputs concurrently.
+        
+        Parameters
+        ----------
+        items : Sequence[Tuple[Optional[str or bytes], Optional[str]]]
+            ``(image, text)`` pairs; either element may be None, not both.
+            
+        Returns
+        -------
+        List[Dict[str, Any]]
+            Generated content, in the order of ``items``.
+            
+        Raises
+        ------
+        ContentGenerationError
+            If any of the generations fails.
+        """
+        # Fan out all items at once; _call_openai_api bounds the number of
+        # requests actually in flight with the service semaphore
+        return await asyncio.gather(*(self._route(image, text) for image, text in items))
+    
+    async def _route(self, image_path: Optional[Union[str, bytes]], text: Optional[str]) -> Dict[str, Any]:
+        """Dispatch one batch item to the matching ``generate_from_*`` method."""
+        if image_path is not None and text:
+            return await self.generate_from_both(image_path, text)
+        if image_path is not None:
+            return await self.generate_from_image(image_path)
+        if text:
+            return await self.generate_from_text(text)
+        raise ContentGenerationError("Batch item has neither image nor text")
+    
+    @staticmethod
+    def _describe_image(image_path: Union[str, bytes]) -> str:
+        """Return a short log-friendly description of an image source."""
+        if isinstance(image_path, bytes):
+            return f"<{len(image_path)} bytes in memory>"
+        return image_path
+    
+    async def _load_image(self, image_path: Union[str, bytes]) -> Image.Image:
         """
-        Load image from file path or URL.
+        Load image from file path or raw bytes.
         
         Parameters
         ----------
-        image_path : str
-            Path to image file or URL.
+        image_path : str or bytes
+            Path to image file, or image bytes.
             
         Returns
         -------
@@ -222,46 +487,246 @@ class OpenAIService:
             If image loading fails.
         """
         try:
-            if image_path.startswith("http"):
-                response = requests.get(image_path, timeout=30)
-                response.raise_for_status()
-                image = Image.open(BytesIO(response.content)).convert("RGB")
-            else:
-                image = Image.open(image_path).convert("RGB")
-            
-            return image
+            # Decoding and resizing block, keep them off the event loop
+            return await asyncio.to_thread(_open_image, image_path)
             
         except Exception as e:
             raise ContentGenerationError(f"Failed to load image: {e}")
     
-    def _encode_image_to_base64(self, image: Image.Image) -> str:
+    @staticmethod
+    def _fit_vision_bounds(image: Image.Image) -> Image.Image:
         """
-        Encode PIL image to base64 string.
+        Convert to RGB and shrink to the Vision input bounds.
+        
+        Parameters
+        ----------
+        image : PIL.Image.Image
+            Freshly opened (not yet decoded) image.
+            
+        Returns
+        -------
+        PIL.Image.Image
+            RGB image no larger than ``VISION_MAX_LONG_SIDE`` on the long
+            side and ``VISION_MAX_SHORT_SIDE`` on the short side.
+        """
+        width, height = image.size
+        scale = min(
+            1.0,
+            VISION_MAX_LONG_SIDE / max(width, height),
+            VISION_MAX_SHORT_SIDE / min(width, height),
+        )
+        target = (max(1, round(width * scale)), max(1, round(height * scale)))
+        
+        # Let libjpeg decode at a reduced scale before resampling
+        if scale < 1.0 and image.format == "JPEG":
+            image.draft("RGB", target)
+        
+        # convert() always copies, even when the mode already matches
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        if image.size != target:
+            image = image.resize(target, Image.Resampling.LANCZOS)
+        return image
+    
+    @staticmethod
+    def _encode_jpeg_bytes(image: Image.Image) -> bytes:
+        """
+        Encode PIL image to JPEG bytes.
         
         Parameters
         ----------
         image : PIL.Image.Image
-            Image to encode.
+            RGB image to encode.
+            
+        Returns
+        -------
+        bytes
+            JPEG-encoded image.
+        """
+        # libjpeg-turbo straight from the pixel array, no BytesIO round trip;
+        # fast DCT is fine for an image that is only sent to the model
+        return simplejpeg.encode_jpeg(np.asarray(image), quality=85, colorspace="RGB", fastdct=True)
+    
+    @staticmethod
+    def _encode_image_to_base64(image: Optional[Image.Image],
+                                jpeg_bytes: Optional[Union[bytes, memoryview]] = None) -> str:
+        """
+        Encode PIL image to base64 string.
+        
+        Parameters
+        ----------
+        image : PIL.Image.Image or None
+            Image to encode; may be None when ``jpeg_bytes`` is given.
+        jpeg_bytes : bytes or memoryview, optional
+            Already encoded JPEG bytes of ``image``; skips re-encoding.
             
         Returns
         -------
         str
             Base64 encoded image string.
         """
-        buffered = BytesIO()
-        image.save(buffered, format="JPEG", quality=85)
-        return base64.b64encode(buffered.getvalue()).decode("utf-8")
+        if jpeg_bytes is None:
+            jpeg_bytes = OpenAIService._encode_jpeg_bytes(image)
+        # Encodes straight into a str: no intermediate bytes object to decode
+        return pybase64.b64encode_as_string(jpeg_bytes)
+    
+    def _read_jpeg_passthrough(self, image_path: Union[str, bytes]) -> Optional[bytes]:
+        """
+        Return the source bytes if they can be sent to the API as is.
+        
+        Only a local file or in-memory RGB JPEG that already fits the
+        Vision bounds qualifies; only its header is parsed, nothing is
+        decoded.
+        
+        Parameters
+        ----------
+        image_path : str or bytes
+            Path to image file, or image bytes.
+            
+        Returns
+        -------
+        Optional[bytes]
+            Original JPEG bytes, or None if the image must be re-encoded.
+        """
+        try:
+            source = BytesIO(image_path) if isinstance(image_path, bytes) else image_path
+            
+            # Image.open reads only the header; pixels are never decoded here
+            with Image.open(source) as image:
+                width, height = image.size
+                if not (
+                    image.format == "JPEG"
+                    and image.mode == "RGB"
+                    and max(width, height) <= VISION_MAX_LONG_SIDE
+                    and min(width, height) <= VISION_MAX_SHORT_SIDE
+                ):
+                    return None
+            
+            if isinstance(image_path, bytes):
+                data = image_path
+            else:
+                if os.path.getsize(image_path) > JPEG_PASSTHROUGH_MAX_BYTES:
+                    return None
+                with open(image_path, "rb") as f:
+                    data = f.read()
+            return data if len(data) <= JPEG_PASSTHROUGH_MAX_BYTES else None
+        except Exception as e:
+            logger.debug(f"JPEG passthrough not possible: {e}")
+            return None
+    
+    async def _image_url(self, image_path: Union[str, bytes]) -> str:
+        """
+        Build the image URL for the Vision API.
+        
+        Parameters
+        ----------
+        image_path : str or bytes
+            Path to image file, URL, or image bytes.
+            
+        Returns
+        -------
+        str
+            An HTTP(S) URL unchanged: the API fetches it itself, so remote
+            images are never downloaded or decoded here. Otherwise a
+            ``data:image/jpeg;base64`` URL with the JPEG encoded at most
+            once; suitable JPEGs are embedded without decoding.
+        """
+        if isinstance(image_path, str) and image_path.startswith(("http://", "https://")):
+            return image_path
+        
+        # Header parse and file read block: run them in a thread
+        jpeg_bytes = await asyncio.to_thread(self._read_jpeg_passthrough, image_path)
+        if jpeg_bytes is not None:
+            base64_image = self._encode_image_to_base64(None, jpeg_bytes)
+        elif _IMAGE_POOL is not None:
+            # Decode/resize/encode is CPU-bound: run it on another core
+            base64_image = await asyncio.get_running_loop().run_in_executor(
+                _IMAGE_POOL, _load_and_encode_jpeg, image_path
+            )
+        else:
+            # In-process mode (or pool not started): PIL releases the GIL while decoding and
+            # encoding, so threads still overlap with in-flight API calls
+            image = await self._load_image(image_path)
+            base64_image = await asyncio.to_thread(self._encode_image_to_base64, image)
+        return f"data:image/jpeg;base64,{base64_image}"
+    
+    def _cache_key(self, system_prompt: str, user_text: Optional[str],
+                   image_url: Optional[str]) -> str:
+        """
+        Digest of everything that determines the model response.
+        
+        Parameters
+        ----------
+        system_prompt : str
+            System message text.
+        user_text : Optional[str]
+            User message text.
+        image_url : Optional[str]
+            Image URL; for data URLs this covers the encoded image bytes.
+            
+        Returns
+        -------
+        str
+            Hex digest used as the response cache key.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (self.model, system_prompt, user_text or "", image_url or ""):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
     
-    # Removed external image hosting dependency (imgbb); using base64 data URLs instead
+    async def _generate(self, system_prompt: str, user_text: Optional[str] = None,
+                        image_url: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Call the model through the response cache and parse its reply.
+        
+        A response is cached only after it parsed into real content, so a
+        refusal, malformed reply or placeholder is not served to a retry.
+        
+        Parameters
+        ----------
+        system_prompt : str
+            Static instructions, sent as the system message.
+        user_text : Optional[str]
+            Per-request text for the user message (if provided).
+        image_url : Optional[str]
+            URL of the image (if provided).
+            
+        Returns
+        -------
+        Dict[str, Any]
+            Structured content dictionary.
+            
+        Raises
+        ------
+        ContentGenerationError
+            If the API call or response parsing fails.
+        """
+        # Identical request seen recently (e.g. a user retrying): no API call.
+        # The raw text is parsed again on a hit, so callers never share a dict
+        cache_key = self._cache_key(system_prompt, user_text, image_url)
+        cached = _RESPONSE_CACHE.get(cache_key)
+        if cached is not None:
+            logger.info("Returning cached model response")
+            return self._parse_response(cached)
+        
+        response = await self._call_openai_api(system_prompt, user_text, image_url)
+        content = self._parse_response(response)
+        if content['title'] != _FALLBACK_TITLE:
+            _RESPONSE_CACHE[cache_key] = response
+        return content
     
-    async def _call_openai_api(self, prompt: str, image_url: Optional[str] = None) -> str:
+    async def _call_openai_api(self, system_prompt: str, user_text: Optional[str] = None,
+                               image_url: Optional[str] = None) -> str:
         """
         Make API call to OpenAI with retry mechanism.
         
         Parameters
         ----------
-        prompt : str
-            Text prompt for the model.
+        system_prompt : str
+            Static instructions, sent as the system message.
+        user_text : Optional[str]
+            Per-request text for the user message (if provided).
         image_url : Optional[str]
             URL of the image (if provided).
             
@@ -276,46 +741,51 @@ class OpenAIService:
             If API call fails after all retries.
         """
         max_retries = 3
-        retry_delay = 1  # seconds
+        retry_delay = 1  # seconds, doubled on every retry (1s, 2s, ...)
+        
+        # Prepare Chat Completions API input: the system message is identical
+        # across calls, the user message carries only the dynamic part
+        if image_url:
+            # Vision model format
+            user_content = []
+            if user_text:
+                user_content.append({"type": "text", "text": user_text})
+            user_content.append({
+                "type": "image_url",
+                "image_url": {"url": image_url},
+            })
+        else:
+            # Text only format
+            user_content = user_text or ""
+        
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content},
+        ]
         
         for attempt in range(max_retries):
             try:
-                # Prepare Chat Completions API input
-                if image_url:
-                    # Vision model format
-                    user_content = [
-                        {
-                            "type": "text",
-                            "text": prompt,
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {"url": image_url},
-                        }
-                    ]
-                else:
-                    # Text only format
-                    user_content = prompt
-
-                messages = [{
-                    "role": "user",
-                    "content": user_content,
-                }]
-                
-                response = await self.client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    max_tokens=self.max_tokens,
-                )
+                # Only the request itself holds a slot, not the retry backoff
+                async with self._sem:
+                    response = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        max_tokens=self.max_tokens,
+                        # JSON mode: the reply is a single JSON object, so
+                        # _parse_response takes its direct orjson.loads path
+                        response_format={"type": "json_object"},
+                    )
 
                 # Extract text from Chat Completions API
                 result = None
-                logger.info(f"Response received: {response}")
+                # Lazy %-args: the whole response object is only formatted
+                # when DEBUG is actually enabled
+                logger.debug("Response received: %r", response)
                 if hasattr(response, "choices") and response.choices:
-                    logger.info(f"Choices found: {len(response.choices)}")
+                    logger.debug("Choices found: %d", len(response.choices))
                     try:
                         result = response.choices[0].message.content
-                        logger.info(f"Extracted content: {result}")
+                        logger.debug("Extracted content: %s", result)
                     except Exception as e:
                         logger.warning(f"Failed to extract content: {e}")
                         result = None
@@ -326,8 +796,7 @@ class OpenAIService:
                 if not result or not str(result).strip():
                     logger.warning(f"Empty response on attempt {attempt + 1}")
                     if attempt < max_retries - 1:
-                        import asyncio
-                        await asyncio.sleep(retry_delay)
+                        await asyncio.sleep(retry_delay * (2 ** attempt))
                         continue
                     raise ContentGenerationError("Empty model response after all retries")
 
@@ -336,8 +805,7 @@ class OpenAIService:
             except Exception as e:
                 logger.warning(f"OpenAI API call failed on attempt {attempt + 1}: {e}")
                 if attempt < max_retries - 1:
-                    import asyncio
-                    await asyncio.sleep(retry_delay)
+                    await asyncio.sleep(retry_delay * (2 ** attempt))
                     continue
                 else:
                     raise ContentGenerationError(f"OpenAI API call failed after {max_retries} attempts: {e}")
@@ -364,76 +832,50 @@ class OpenAIService:
             If response parsing fails.
         """
         try:
-            logger.debug(f"Parsing response of length {len(response)}: {response[:200]}...")
+            logger.debug("Parsing response of length %d: %.200s...", len(response), response)
             
             # If JSON is returned (preferred), parse it directly
             parsed_json: Optional[dict] = None
             try:
                 # Попробуем сначала прямой парсинг
-                parsed_json = json.loads(response)
+                parsed_json = orjson.loads(response)
                 logger.info("Successfully parsed response as direct JSON")
             except Exception as e:
-                logger.debug(f"Direct JSON parsing failed: {e}")
-                # Если не получилось, попробуем извлечь JSON из markdown блока
-                try:
-                    # Ищем JSON в ```json блоках с более точным паттерном
-                    import re
-                    json_match = re.search(r'```(?:json)?\s*(\{[^`]*\})\s*```', response, re.DOTALL)
-                    if json_match:
-                        parsed_json = json.loads(json_match.group(1))
-                        logger.info("Successfully extracted JSON from markdown code block")
-                    else:
-                        # Ищем полный JSON объект (считаем скобки)
-                        start = response.find('{')
-                        if start != -1:
-                            brace_count = 0
-                            end = start
-                            for i, char in enumerate(response[start:], start):
-                                if char == '{':
-                                    brace_count += 1
-                                elif char == '}':
-                                    brace_count -= 1
-                                    if brace_count == 0:
-                                        end = i + 1
-                                        break
-                            
-                            if brace_count == 0:
-                                json_str = response[start:end]
-                                parsed_json = json.loads(json_str)
-                                logger.info("Successfully extracted JSON by counting braces")
-                except Exception as e:
-                    logger.warning(f"Failed to extract JSON from response: {e}")
-                    logger.debug(f"Response content: {response[:500]}...")  # Логируем первые 500 символов
-                    parsed_json = None
+                logger.debug("Direct JSON parsing failed: %s", e)
+                # Если не получилось, ищем первый JSON объект в тексте (в том
+                # числе внутри markdown блока): raw_decode сам находит его конец
+                start = response.find('{')
+                while start != -1:
+                    try:
+                        parsed_json, _ = _JSON_DECODER.raw_decode(response, start)
+                        logger.info("Successfully extracted embedded JSON object")
+                        break
+                    except json.JSONDecodeError:
+                        start = response.find('{', start + 1)
+                else:
+                    logger.warning("Failed to extract JSON from response")
+                    logger.debug("Response content: %.500s...", response)  # Логируем первые 500 символов
 
             if parsed_json and isinstance(parsed_json, dict):
                 content = {
                     'title': str(parsed_json.get('title', '')).strip(),
                     'short_description': str(parsed_json.get('short_description', '')).strip(),
                     'full_description': str(parsed_json.get('full_description', '')).strip(),
-                    'features': [str(x).strip() for x in (parsed_json.get('features') or []) if str(x).strip()],
-                    'seo_keywords': [str(x).strip() for x in (parsed_json.get('seo_keywords') or []) if str(x).strip()],
-                    'target_audience': [str(x).strip() for x in (parsed_json.get('target_audience') or []) if str(x).strip()],
+                    'features': _clean_list(parsed_json.get('features')),
+                    'seo_keywords': _clean_list(parsed_json.get('seo_keywords')),
+                    'target_audience': _clean_list(parsed_json.get('target_audience')),
                 }
                 
                 # Логируем успешную обработку JSON
-                logger.info(f"Successfully parsed JSON response with {len(content['features'])} features, {len(content['seo_keywords'])} keywords")
+                logger.info(
+                    "Successfully parsed JSON response with %d features, %d keywords",
+                    len(content['features']), len(content['seo_keywords'])
+                )
                 # Fill defaults without rejecting JSON
-                if not content['title']:
-                    content['title'] = "Товар"
-                if not content['short_description']:
-                    content['short_description'] = content['full_description'][:120] or "Стильный и функциональный товар"
-                if not content['full_description']:
-                    content['full_description'] = content['short_description']
-                if not content['features']:
-                    content['features'] = ["Высокое качество", "Стильный дизайн"]
-                if not content['seo_keywords']:
-                    content['seo_keywords'] = ["описание товара", "характеристики"]
-                if not content['target_audience']:
-                    content['target_audience'] = ["Покупатели", "Потребители"]
-                return content
-
-            # Textual fallback parsing
+                return _fill_defaults(content, _JSON_DEFAULTS, short_from_full=True)
+
+            # Textual fallback parsing: only reached if the model ignored
+            # JSON mode (e.g. a model without response_format support)
             if not response or len(response.strip()) < 20:
                 logger.warning(
                     f"Response too short or empty: {0 if not response else len(response)} characters"
@@ -441,18 +883,12 @@ class OpenAIService:
                 raise ContentGenerationError("Model response too short")
             
             # Check for common error patterns
-            error_patterns = [
-                'sorry', 'извините', 'error', 'ошибка', 'не могу', 'cannot',
-                'unable', 'не удается', 'не понимаю', 'don\'t understand'
-            ]
-            
             response_lower = response.lower()
-            if any(pattern in response_lower for pattern in error_patterns):
+            if _contains_any(_PARSE_ERROR_PATTERNS, response_lower):
                 logger.warning(f"Response contains error patterns: {response[:100]}...")
                 raise ContentGenerationError("Model response indicates error")
             
             # Extract structured information from response
-            lines = response.strip().split('\n')
             content = {
                 'title': '',
                 'short_description': '',
@@ -464,31 +900,31 @@ class OpenAIService:
             
             current_section = None
             
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
+            # One regex sweep over the response: blank lines are skipped by
+            # the pattern itself and each match carries its stripped line
+            for match in _SECTION_RE.finditer(response):
+                line = match.group('line')
+                section = match.lastgroup
                 
-                # Parse sections
-                if 'название' in line.lower() or 'title' in line.lower():
+                if section == 'title':
                     content['title'] = line.split(':', 1)[1].strip() if ':' in line else line
-                elif 'краткое описание' in line.lower() or 'short description' in line.lower():
+                elif section == 'short_description':
                     content['short_description'] = line.split(':', 1)[1].strip() if ':' in line else line
-                elif 'полное описание' in line.lower() or 'full description' in line.lower():
+                elif section == 'full_description':
                     current_section = 'full_description'
                     content['full_description'] = line.split(':', 1)[1].strip() if ':' in line else line
-                elif 'характеристики' in line.lower() or 'features' in line.lower():
+                elif section == 'features':
                     current_section = 'features'
-                elif 'seo' in line.lower() or 'ключевые слова' in line.lower():
+                elif section == 'seo_keywords':
                     current_section = 'seo_keywords'
                     keywords = line.split(':', 1)[1].strip() if ':' in line else line
-                    # Убираем квадратные скобки и кавычки
-                    keywords = keywords.replace('[', '').replace(']', '').replace('"', '').replace("'", '')
+                    # Убираем квадратные скобки и кавычки за один проход
+                    keywords = keywords.translate(_KEYWORD_STRIP_CHARS)
                     # Разбиваем по запятой и убираем лишние пробелы
                     content['seo_keywords'] = [k.strip() for k in keywords.split(',') if k.strip()]
-                elif 'аудитория' in line.lower() or 'target audience' in line.lower():
+                elif section == 'target_audience':
                     current_section = 'target_audience'
-                elif line.startswith('-') or line.startswith('•'):
+                elif section == 'item':
                     item = line[1:].strip()
                     if current_section == 'features':
                         content['features'].append(item)
@@ -506,20 +942,7 @@ class OpenAIService:
                 logger.info(f"Content quality acceptable (score: {quality_score})")
             
             # Fill missing fields with defaults
-            if not content['title'] or len(content['title']) < 5:
-                content['title'] = "Товар - Качественное решение"
-            if not content['short_description'] or len(content['short_description']) < 10:
-                content['short_description'] = "Стильный и функциональный товар"
-            if not content['full_description'] or len(content['full_description']) < 20:
-                content['full_description'] = content['short_description']
-            if not content['features'] or len(content['features']) < 2:
-                content['features'] = ["Высокое качество", "Стильный дизайн"]
-            if not content['seo_keywords'] or len(content['seo_keywords']) < 2:
-                content['seo_keywords'] = ["качественный", "стильный"]
-            if not content['target_audience'] or len(content['target_audience']) < 2:
-                content['target_audience'] = ["Потребители", "Покупатели"]
-            
-            return content
+            return _fill_defaults(content, _TEXT_DEFAULTS)
             
         except Exception as e:
             logger.warning(f"Failed to parse OpenAI response: {e}")
@@ -586,14 +1009,8 @@ class OpenAIService:
             return False
         
         # Check for common error patterns
-        error_patterns = [
-            'sorry', 'извините', 'error', 'ошибка', 'не могу', 'cannot',
-            'unable', 'не удается', 'не понимаю', 'don\'t understand',
-            'i cannot', 'я не могу', 'не удалось', 'failed'
-        ]
-        
         response_lower = response.lower()
-        if any(pattern in response_lower for pattern in error_patterns):
+        if _contains_any(_QUALITY_ERROR_PATTERNS, response_lower):
             return False
         
         # Check for repetitive content
@@ -602,8 +1019,7 @@ class OpenAIService:
             return False
         
         # Check for meaningful content (should contain product-related words)
-        product_words = ['товар', 'продукт', 'изделие', 'предмет', 'характеристики', 'описание']
-        if not any(word in response_lower for word in product_words):
+        if not _contains_any(_PRODUCT_WORDS, response_lower):
             return False
         
         return True
@@ -618,12 +1034,41 @@ class OpenAIService:
             Fallback content structure.
         """
         return {
-            'title': 'Временная заглушка',
+            'title': _FALLBACK_TITLE,
             'short_description': 'Сервис генерации временно вернул укороченный ответ. Ниже — базовое описание.',
             'full_description': 'Мы не смогли получить полноценный ответ от модели прямо сейчас. Повторите запрос позже для улучшения результата. Эти данные подходят как черновик.',
             'features': ['Универсальный дизайн', 'Подходит для ежедневного использования'],
             'seo_keywords': ['описание товара', 'характеристики'],
             'target_audience': ['Широкая аудитория']
         }
-    
 
+
+def _warm_up() -> None:
+    """No-op task that makes the image pool start a worker."""
+
+
+def _open_image(source: Union[str, bytes]) -> Image.Image:
+    """Open a local path or image bytes and fit it to the Vision bounds."""
+    image = Image.open(BytesIO(source) if isinstance(source, bytes) else source)
+    return OpenAIService._fit_vision_bounds(image)
+
+
+def _load_and_encode_jpeg(source: Union[str, bytes]) -> str:
+    """
+    Open, resize, JPEG-encode and base64 an image.
+    
+    Entry point for the image worker processes: it takes a path or raw
+    bytes and returns a string, so no PIL object crosses the process
+    boundary.
+    
+    Parameters
+    ----------
+    source : str or bytes
+        Local image path or image bytes.
+        
+    Returns
+    -------
+    str
+        Base64 encoded JPEG.
+    """
+    return OpenAIService._encode_image_to_base64(_open_image(source))
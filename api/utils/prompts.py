@@ -1,9 +1,10 @@
 """
 Промпты для генерации контента товаров
 """
+from typing import Final
 
 # Промпт для анализа изображения
-IMAGE_ANALYSIS_PROMPT = """
+IMAGE_ANALYSIS_PROMPT: Final[str] = """
 Проанализируй изображение товара и создай профессиональное описание для маркетплейса.
 
 Создай:
@@ -14,7 +15,7 @@ IMAGE_ANALYSIS_PROMPT = """
 5. SEO-ключи (8-12 слов/фраз для продвижения)
 6. Целевую аудиторию (3-5 групп)
 
-Формат ответа должен быть в JSON:
+Ответ - один JSON объект с ключами ниже, без пояснений и markdown:
 {{
     "title": "Название товара",
     "short_description": "Краткое описание", 
@@ -26,7 +27,7 @@ IMAGE_ANALYSIS_PROMPT = """
 """
 
 # Промпт для обработки текста
-TEXT_PROCESSING_PROMPT = """
+TEXT_PROCESSING_PROMPT: Final[str] = """
 Дополни и улучши описание товара, добавив SEO-оптимизацию и характеристики.
 
 Исходный текст: {text}
@@ -39,7 +40,7 @@ TEXT_PROCESSING_PROMPT = """
 5. SEO-ключи (8-12 слов/фраз для продвижения)
 6. Целевую аудиторию (3-5 групп)
 
-Формат ответа должен быть в JSON:
+Ответ - один JSON объект с ключами ниже, без пояснений и markdown:
 {{
     "title": "Название товара",
     "short_description": "Краткое описание", 
@@ -51,7 +52,7 @@ TEXT_PROCESSING_PROMPT = """
 """
 
 # Промпт для комбинированной обработки
-COMBINED_PROCESSING_PROMPT = """
+COMBINED_PROCESSING_PROMPT: Final[str] = """
 Проанализируй изображение товара и объедини с текстовым описанием для создания полной карточки товара.
 
 Текстовое описание: {text}
@@ -64,7 +65,7 @@ COMBINED_PROCESSING_PROMPT = """
 5. SEO-ключи (8-12 слов/фраз для продвижения)
 6. Целевую аудиторию (3-5 групп)
 
-Формат ответа должен быть в JSON:
+Ответ - один JSON объект с ключами ниже, без пояснений и markdown:
 {{
     "title": "Название товара",
     "short_description": "Краткое описание", 
@@ -76,7 +77,7 @@ COMBINED_PROCESSING_PROMPT = """
 """
 
 # Промпт для извлечения характеристик из изображения
-IMAGE_FEATURES_PROMPT = """
+IMAGE_FEATURES_PROMPT: Final[str] = """
 Извлеки основные характеристики товара из изображения:
 
 - Материалы и качество
@@ -93,7 +94,7 @@ IMAGE_FEATURES_PROMPT = """
 """
 
 # Промпт для генерации SEO-ключей
-SEO_KEYWORDS_PROMPT = """
+SEO_KEYWORDS_PROMPT: Final[str] = """
 Сгенерируй SEO-ключи для продвижения товара на маркетплейсах.
 
 Основная информация о товаре: {product_info}
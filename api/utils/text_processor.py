@@ -6,10 +6,30 @@
 """
 
 import logging
+import re
 from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
+# Последовательности пробельных символов, схлопываемые clean_text
+_WS_RE = re.compile(r'\s+')
+# Потенциально опасные символы, вырезаемые clean_text
+_STRIP_CHARS = str.maketrans('', '', '<>')
+# Поля, проверяемые validate_content_structure
+_REQUIRED_FIELDS = ('title', 'short_description', 'full_description')
+_OPTIONAL_FIELDS = ('features', 'seo_keywords', 'target_audience', 'usage_scenarios')
+_LIST_OR_STR = (str, list)
+# (ключ ответа, ключ контента) в порядке полей ответа API
+_FORMATTED_FIELDS = (
+    ('title', 'title'),
+    ('short_description', 'short_description'),
+    ('detailed_description', 'full_description'),
+    ('features', 'features'),
+    ('seo_keywords', 'seo_keywords'),
+    ('target_audience', 'target_audience'),
+    ('usage_scenarios', 'usage_scenarios'),
+)
+
 
 def validate_content_structure(content: Dict[str, Any]) -> bool:
     """
@@ -33,22 +53,20 @@ def validate_content_structure(content: Dict[str, Any]) -> bool:
     if not isinstance(content, dict):
         raise ValueError("Контент должен быть словарем")
     
-    required_fields = ['title', 'short_description', 'full_description']
-    
-    for field in required_fields:
+    for field in _REQUIRED_FIELDS:
         if field not in content:
             raise ValueError(f"Отсутствует обязательное поле: {field}")
         
-        if not isinstance(content[field], str) or not content[field].strip():
+        # isspace() не создает копию строки, в отличие от strip()
+        value = content[field]
+        if not isinstance(value, str) or not value or value.isspace():
             raise ValueError(f"Поле '{field}' должно быть непустой строкой")
     
     # Проверяем дополнительные поля если они есть
-    optional_fields = ['features', 'seo_keywords', 'target_audience', 'usage_scenarios']
-    for field in optional_fields:
-        if field in content and not isinstance(content[field], (str, list)):
+    for field in _OPTIONAL_FIELDS:
+        if field in content and not isinstance(content[field], _LIST_OR_STR):
             raise ValueError(f"Поле '{field}' должно быть строкой или списком")
     
-    logger.debug("Структура контента валидна")
     return True
 
 
@@ -66,32 +84,19 @@ def format_content_for_response(content: Dict[str, Any]) -> Dict[str, Any]:
     Dict[str, Any]
         Отформатированный контент.
     """
-    # Безопасно обрабатываем строки и списки
-    target_audience = content.get('target_audience', [])
-    if isinstance(target_audience, str):
-        target_audience = target_audience.strip()
-    
-    formatted = {
-        'title': content.get('title', '').strip(),
-        'short_description': content.get('short_description', '').strip(),
-        'detailed_description': content.get('full_description', '').strip(),
-        'features': content.get('features', []),
-        'seo_keywords': content.get('seo_keywords', []),
-        'target_audience': target_audience,
-        'usage_scenarios': content.get('usage_scenarios', [])
-    }
-    
-    # Убираем пустые поля
-    formatted = {k: v for k, v in formatted.items() if v}
+    # Один проход по полям в порядке ответа: пустые поля сразу пропускаем,
+    # без промежуточного словаря
+    formatted = {}
+    for key_out, key_in in _FORMATTED_FIELDS:
+        value = content.get(key_in)
+        if isinstance(value, str):
+            value = value.strip()
+        elif isinstance(value, list) and key_in != 'target_audience':
+            # Списки - убираем пустые элементы
+            value = [item.strip() for item in value if item and item.strip()]
+        if value:
+            formatted[key_out] = value
     
-    # Обрабатываем списки - убираем пустые элементы
-    for field in ['features', 'seo_keywords', 'usage_scenarios']:
-        if field in formatted and isinstance(formatted[field], list):
-            formatted[field] = [item.strip() for item in formatted[field] if item.strip()]
-            if not formatted[field]:  # Если список стал пустым
-                del formatted[field]
-    
-    logger.debug("Контент отформатирован для ответа")
     return formatted
 
 
@@ -115,14 +120,9 @@ def clean_text(text: str) -> str:
     if not text:
         return ""
     
-    # Убираем лишние пробелы и переносы строк
-    cleaned = ' '.join(text.split())
-    
-    # Убираем потенциально опасные символы
-    import re
-    cleaned = re.sub(r'[<>]', '', cleaned)
-    
-    return cleaned.strip()
+    # Убираем лишние пробелы и переносы строк, затем потенциально опасные
+    # символы: regex не строит промежуточный список, как split()
+    return _WS_RE.sub(' ', text).translate(_STRIP_CHARS).strip()
 
 
 def truncate_text(text: str, max_length: int = 1000) -> str:
@@ -144,20 +144,23 @@ def truncate_text(text: str, max_length: int = 1000) -> str:
     if not text or len(text) <= max_length:
         return text
     
+    # Подходят только границы с индексом > max_length * 0.8, поэтому
+    # ищем их только в этом хвосте, а не по всей обрезанной строке
+    tail_start = int(max_length * 0.8) + 1
+    
     # Пытаемся обрезать по последнему предложению
-    truncated = text[:max_length]
     last_sentence_end = max(
-        truncated.rfind('.'),
-        truncated.rfind('!'),
-        truncated.rfind('?')
+        text.rfind('.', tail_start, max_length),
+        text.rfind('!', tail_start, max_length),
+        text.rfind('?', tail_start, max_length)
     )
     
-    if last_sentence_end > max_length * 0.8:  # Если нашли конец предложения не слишком рано
-        return truncated[:last_sentence_end + 1]
+    if last_sentence_end != -1:  # Нашли конец предложения не слишком рано
+        return text[:last_sentence_end + 1]
     
     # Иначе обрезаем по последнему пробелу
-    last_space = truncated.rfind(' ')
-    if last_space > max_length * 0.8:
-        return truncated[:last_space] + '...'
+    last_space = text.rfind(' ', tail_start, max_length)
+    if last_space != -1:
+        return text[:last_space] + '...'
     
-    return truncated + '...'
+    return text[:max_length] + '...'
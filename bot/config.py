@@ -1,17 +1,23 @@
 import os
-from typing import List
+from typing import FrozenSet
 from shared.constants import MESSAGES, MAX_FILE_SIZE, MAX_TEXT_LENGTH, API_TIMEOUT
 
 BOT_TOKEN = os.getenv('BOT_TOKEN', 'your_bot_token_here')
 API_BASE_URL = os.getenv('API_BASE_URL', 'http://localhost:8000')
 
 ADMIN_IDS_STR = os.getenv('ADMIN_IDS', '')
-ADMIN_IDS: List[int] = [int(x.strip()) for x in ADMIN_IDS_STR.split(',') if x.strip()]
+_ADMIN_IDS_ORDERED = [int(x.strip()) for x in ADMIN_IDS_STR.split(',') if x.strip()]
+# frozenset: проверка `in` на каждой команде за O(1)
+ADMIN_IDS: FrozenSet[int] = frozenset(_ADMIN_IDS_ORDERED)
 ADMIN_ID_ENV = os.getenv('ADMIN_ID')
-ADMIN_ID = int(ADMIN_ID_ENV) if ADMIN_ID_ENV and ADMIN_ID_ENV.isdigit() else (ADMIN_IDS[0] if ADMIN_IDS else None)
+ADMIN_ID = int(ADMIN_ID_ENV) if ADMIN_ID_ENV and ADMIN_ID_ENV.isdigit() else (_ADMIN_IDS_ORDERED[0] if _ADMIN_IDS_ORDERED else None)
 
 SUPPORTED_IMAGE_FORMATS_STR = os.getenv('SUPPORTED_IMAGE_FORMATS', 'jpg,jpeg,png,webp')
-SUPPORTED_IMAGE_FORMATS: List[str] = [x.strip() for x in SUPPORTED_IMAGE_FORMATS_STR.split(',')]
+SUPPORTED_IMAGE_FORMATS: FrozenSet[str] = frozenset(x.strip() for x in SUPPORTED_IMAGE_FORMATS_STR.split(','))
+
+# Кэш результатов генерации по содержимому запроса
+RESULT_CACHE_SIZE = int(os.getenv('RESULT_CACHE_SIZE', '512'))
+RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', '3600'))
 
 # API Endpoints
 API_ENDPOINTS = {
@@ -5,7 +5,7 @@ import logging
 from aiogram import Router, F
 from aiogram.types import Message
 from aiogram.filters import Command
-from services.generator import ContentGenerator
+from services.result_service import result_service
 from config import ADMIN_IDS
 
 logger = logging.getLogger(__name__)
@@ -19,7 +19,8 @@ async def cmd_status(message: Message):
         return
     
     try:
-        generator = ContentGenerator()
+        # Общий экземпляр генератора, а не новый на каждую команду
+        generator = result_service.generator
         
         # Проверяем статус API
         api_status = await generator.check_api_health()
@@ -4,19 +4,41 @@
 """
 
 import logging
-import os
+import re
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
 from shared.constants import MESSAGES, MAX_TEXT_LENGTH, MAX_FILE_SIZE
+from shared.utils import FileUtils
 from services.result_service import result_service
 from bot.utils.handlers_common import HandlerUtils
+from bot.utils.download import download_telegram_file
 
 logger = logging.getLogger(__name__)
 router = Router()
 
+# Клавиатуры не меняются между сообщениями, создаем их один раз при импорте
+_POST_IMAGE_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [
+        InlineKeyboardButton(text="📝 Добавить описание", callback_data="continue_with_text"),
+        InlineKeyboardButton(text="🚀 Без описания", callback_data="process_image_only_from_both")
+    ],
+    [
+        InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_start_from_result")
+    ]
+])
+_BACK_KB = HandlerUtils.create_back_keyboard()
+
+# Допустимый текст описания: не пустой, без нулевых байтов, не длиннее лимита.
+# Проверяется одним вызовом fullmatch
+_TEXT_OK = re.compile(r'(?=\s*\S)[^\x00]{1,%d}' % MAX_TEXT_LENGTH)
+_ASK_FOR_TEXT = (
+    "❌ Пожалуйста, отправьте текстовое описание товара.\n\n"
+    "Если хотите начать заново, нажмите /start"
+)
+
 class BothProcessingStates(StatesGroup):
     """Состояния для комбинированной обработки"""
     waiting_for_image = State()
@@ -27,16 +49,20 @@ class BothProcessingStates(StatesGroup):
 async def handle_text_for_both(message: Message, state: FSMContext):
     """Обработчик текста при ожидании комбинированной обработки"""
     try:
-        # Проверяем длину текста
-        if len(message.text) > MAX_TEXT_LENGTH:
-            await message.answer(MESSAGES["text_too_long"])
+        # Проверяем текст: длина, пустота и нулевые байты за один проход
+        text = message.text or ""
+        if not _TEXT_OK.fullmatch(text):
+            if len(text) > MAX_TEXT_LENGTH:
+                await message.answer(MESSAGES["text_too_long"])
+            else:
+                await message.answer(_ASK_FOR_TEXT)
             return
         
         # Получаем данные из состояния
         data = await state.get_data()
         image_path = data.get("image_path")
         
-        if not image_path or not os.path.exists(image_path):
+        if not await HandlerUtils.state_image_exists(data):
             await message.answer("Изображение не найдено. Начните заново с /start")
             await state.clear()
             return
@@ -44,7 +70,7 @@ async def handle_text_for_both(message: Message, state: FSMContext):
         # Используем централизованный сервис для комбинированной генерации
         # НЕ проверяем квоту повторно, так как это одна операция "фото + текст"
         await result_service.process_combined_generation(
-            message, state, image_path, message.text, check_quota=True, generation_type="both"
+            message, state, image_path, text, check_quota=True, generation_type="both"
         )
         
     except Exception as e:
@@ -69,33 +95,21 @@ async def handle_image_for_both(message: Message, state: FSMContext):
         
         # Скачиваем файл
         file_info = await message.bot.get_file(photo.file_id)
-        file_path = f"temp/{photo.file_id}.jpg"
+        # Каталог TEMP_DIR создается один раз при запуске бота
+        file_path = FileUtils.temp_file_path(photo.file_id)
         
-        os.makedirs("temp", exist_ok=True)
-        await message.bot.download_file(file_info.file_path, file_path)
+        await download_telegram_file(message.bot, file_info, file_path)
         
         # Сохраняем путь к файлу в состоянии
-        await state.update_data(image_path=file_path, photo_file_id=photo.file_id)
+        await state.update_data(image_path=file_path, image_exists=True, photo_file_id=photo.file_id)
         
         # Переходим к состоянию ожидания текста
         await state.set_state(BothProcessingStates.waiting_for_text)
         
-        # Создаем клавиатуру с вариантами
-        from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [
-                InlineKeyboardButton(text="📝 Добавить описание", callback_data="continue_with_text"),
-                InlineKeyboardButton(text="🚀 Без описания", callback_data="process_image_only_from_both")
-            ],
-            [
-                InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_start_from_result")
-            ]
-        ])
-        
         await message.answer(
             "✅ **Изображение получено!**\n\n"
             "📝 Хотите добавить текстовое описание для создания полной карточки или обработать только фото?",
-            reply_markup=keyboard,
+            reply_markup=_POST_IMAGE_KB,
             parse_mode="Markdown"
         )
         
@@ -117,18 +131,12 @@ async def handle_non_image_for_both(message: Message, state: FSMContext):
 @router.message(BothProcessingStates.waiting_for_text, ~F.text)
 async def handle_non_text_for_both(message: Message, state: FSMContext):
     """Обработчик неправильного типа сообщения при ожидании текста"""
-    await message.answer(
-        "❌ Пожалуйста, отправьте текстовое описание товара.\n\n"
-        "Если хотите начать заново, нажмите /start"
-    )
+    await message.answer(_ASK_FOR_TEXT)
 
 
 @router.callback_query(F.data == "continue_with_text")
 async def continue_with_text(callback: CallbackQuery, state: FSMContext):
     """Пользователь выбрал продолжить с добавлением текста"""
-    from bot.utils.handlers_common import HandlerUtils
-    keyboard = HandlerUtils.create_back_keyboard()
-    
     # Удаляем предыдущее сообщение, чтобы оно не оставалось в истории
     try:
         await callback.message.delete()
@@ -139,7 +147,7 @@ async def continue_with_text(callback: CallbackQuery, state: FSMContext):
     await callback.message.answer(
         "📝 **Отправьте текстовое описание товара**\n\n"
         "Я объединю его с анализом изображения и создам полную карточку товара.",
-        reply_markup=keyboard,
+        reply_markup=_BACK_KB,
         parse_mode="Markdown"
     )
     await callback.answer()
@@ -153,7 +161,7 @@ async def process_image_only_from_both(callback: CallbackQuery, state: FSMContex
         data = await state.get_data()
         image_path = data.get("image_path")
         
-        if not image_path or not os.path.exists(image_path):
+        if not await HandlerUtils.state_image_exists(data):
             await callback.message.edit_text("Изображение не найдено. Начните заново с /start")
             await state.clear()
             return
@@ -179,5 +187,4 @@ async def back_to_both_menu(callback: CallbackQuery, state: FSMContext):
         pass  # Игнорируем ошибки
     
     # Отправляем новое меню, не редактируя предыдущее сообщение
-    from bot.utils.handlers_common import HandlerUtils
     await HandlerUtils.send_welcome_menu(callback, edit=False)
\ No newline at end of file
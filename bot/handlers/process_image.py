@@ -5,19 +5,51 @@
 
 import logging
 import os
-import aiofiles
+from typing import Optional
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
-from shared.constants import MESSAGES, MAX_FILE_SIZE, SUPPORTED_IMAGE_FORMATS
+from shared.constants import MESSAGES, MAX_FILE_SIZE, MAX_TEXT_LENGTH, SUPPORTED_IMAGE_FORMATS
+from shared.utils import FileUtils
 from services.result_service import result_service
 from bot.utils.handlers_common import HandlerUtils
+from bot.utils.download import download_telegram_bytes, download_telegram_file
 
 logger = logging.getLogger(__name__)
 router = Router()
 
+
+async def _state_image_path(bot, state: FSMContext, data: dict) -> Optional[str]:
+    """
+    Путь к изображению из состояния.
+    
+    Прямая обработка держит фото только в памяти и сохраняет в состоянии
+    photo_file_id и photo_ext; файл на диск скачивается здесь, только если
+    он нужен, и запоминается в состоянии вместе с флагом image_exists.
+    """
+    if await HandlerUtils.state_image_exists(data):
+        return data["image_path"]
+    
+    file_id = data.get("photo_file_id")
+    if not file_id:
+        return None
+    
+    # Расширение исходного файла: PNG или WebP из документа не должен
+    # уйти в API под именем *.jpg
+    image_path = FileUtils.temp_file_path(file_id, data.get("photo_ext", "jpg"))
+    try:
+        file_info = await bot.get_file(file_id)
+        await download_telegram_file(bot, file_info, image_path)
+    except Exception as e:
+        logger.warning(f"Не удалось повторно скачать изображение {file_id}: {e}")
+        return None
+    
+    await state.update_data(image_path=image_path, image_exists=True)
+    return image_path
+
+
 class ImageProcessingStates(StatesGroup):
     """Состояния для обработки изображений"""
     waiting_for_text = State()
@@ -26,6 +58,24 @@ class ImageProcessingStates(StatesGroup):
 @router.message(F.photo)
 async def handle_image(message: Message, state: FSMContext):
     """Обработчик получения изображения с прямой обработкой"""
+    # Получаем файл наибольшего размера
+    photo = message.photo[-1]
+    await _ingest_photo(message, state, photo.file_id, photo.file_size, f"{photo.file_id}.jpg")
+
+
+async def _ingest_photo(
+    message: Message,
+    state: FSMContext,
+    file_id: str,
+    file_size: Optional[int],
+    filename: str
+) -> None:
+    """
+    Прямая обработка изображения из фото или документа.
+    
+    Проверки идут от дешевых к дорогим: состояние и размер, затем квота
+    в Redis, и только потом запросы к Telegram за файлом.
+    """
     # Проверяем, что мы НЕ в состоянии ожидания изображения для комбинированной обработки
     current_state = await state.get_state()
     if current_state and ("BothProcessingStates" in current_state or "TextProcessingStates" in current_state):
@@ -39,7 +89,12 @@ async def handle_image(message: Message, state: FSMContext):
         
         user_id = message.from_user.id
         
-        # Проверяем квоту сразу
+        # Проверяем размер файла
+        if file_size and file_size > MAX_FILE_SIZE:
+            await message.answer(MESSAGES["file_too_large"])
+            return
+        
+        # Проверяем квоту
         if not result_service._is_admin(user_id):
             remaining = await quota_utils.subs.get_remaining(user_id)
             if remaining <= 0:
@@ -47,29 +102,19 @@ async def handle_image(message: Message, state: FSMContext):
                 await message.answer(MESSAGES["quota_exceeded"], reply_markup=keyboard, parse_mode="Markdown")
                 return
         
-        # Получаем файл наибольшего размера
-        photo = message.photo[-1]
-        
-        # Проверяем размер файла
-        if photo.file_size > MAX_FILE_SIZE:
-            await message.answer(MESSAGES["file_too_large"])
-            return
-        
         # Отправляем сообщение о прямой обработке
         quota_status = await quota_utils.get_quota_indicator(user_id)
         processing_text = MESSAGES["direct_processing"].format(quota_status=quota_status)
         processing_msg = await message.answer(processing_text, parse_mode="Markdown")
         
-        # Скачиваем файл
-        file_info = await message.bot.get_file(photo.file_id)
-        file_path = f"temp/{photo.file_id}.jpg"
-        
-        os.makedirs("temp", exist_ok=True)
-        await message.bot.download_file(file_info.file_path, file_path)
+        # Скачиваем фото в память: запись во временный файл и повторное
+        # чтение для отправки в API не нужны
+        file_info = await message.bot.get_file(file_id)
+        image = await download_telegram_bytes(message.bot, file_info)
         
         # Прямая обработка через результирующий сервис
         await result_service._consume_quota(user_id)
-        content = await result_service.generator.generate_from_image(file_path)
+        content = await result_service.generator.generate_from_image_bytes(image, filename)
         
         # Удаляем сообщение о загрузке после завершения генерации
         try:
@@ -93,14 +138,12 @@ async def handle_image(message: Message, state: FSMContext):
         keyboard = HandlerUtils.create_result_keyboard(show_upgrade_hint=show_upgrade_hint, generation_type="image")
         await message.answer(formatted_content, parse_mode="Markdown", reply_markup=keyboard)
         
-        # Сохраняем путь к файлу в состоянии
+        # Сохраняем id фото и расширение в состоянии: если оно понадобится
+        # снова, _state_image_path скачает его на диск
         await state.update_data(
-            image_path=file_path, 
-            photo_file_id=photo.file_id
+            photo_file_id=file_id, photo_ext=os.path.splitext(filename)[1][1:] or "jpg"
         )
         
-        # НЕ удаляем файл здесь - он может понадобиться для добавления текста
-        
         logger.info(f"Прямая обработка изображения завершена для пользователя {user_id}")
         
     except Exception as e:
@@ -112,9 +155,9 @@ async def handle_image(message: Message, state: FSMContext):
 async def process_image_now(callback: CallbackQuery, state: FSMContext):
     """Обработка только изображения"""
     data = await state.get_data()
-    image_path = data.get("image_path")
+    image_path = await _state_image_path(callback.bot, state, data)
     
-    if not image_path or not os.path.exists(image_path):
+    if not image_path:
         await callback.message.edit_text("Изображение не найдено. Начните заново с /start")
         await state.clear()
         return
@@ -132,15 +175,15 @@ async def handle_text_with_image(message: Message, state: FSMContext):
     """Обработка текста при наличии изображения"""
     try:
         # Проверяем длину текста
-        if len(message.text) > 5000:
+        if len(message.text) > MAX_TEXT_LENGTH:
             await message.answer(MESSAGES["text_too_long"])
             return
         
         # Получаем данные из состояния
         data = await state.get_data()
-        image_path = data.get("image_path")
+        image_path = await _state_image_path(message.bot, state, data)
         
-        if not image_path or not os.path.exists(image_path):
+        if not image_path:
             await message.answer("Изображение не найдено. Начните заново с /start")
             await state.clear()
             return
@@ -172,21 +215,21 @@ async def back_to_image_menu(callback: CallbackQuery, state: FSMContext):
 
 # Обработчики для несовместимых форматов и больших файлов
 @router.message(F.document)
-async def handle_document(message: Message):
+async def handle_document(message: Message, state: FSMContext):
     """Обработчик документов (возможно изображения в виде файлов)"""
-    if message.document.mime_type and message.document.mime_type.startswith('image/'):
+    document = message.document
+    if document.mime_type and document.mime_type.startswith('image/'):
         # Проверяем формат
-        file_ext = message.document.file_name.split('.')[-1].lower() if message.document.file_name else ''
+        # splitext дает '' для имени без точки: файл "jpg" без расширения
+        # не проходит проверку, в отличие от rpartition('.')[2]
+        file_ext = os.path.splitext(document.file_name or '')[1][1:].lower()
         if file_ext not in SUPPORTED_IMAGE_FORMATS:
             await message.answer(MESSAGES["unsupported_format"])
             return
         
-        # Проверяем размер
-        if message.document.file_size > MAX_FILE_SIZE:
-            await message.answer(MESSAGES["file_too_large"])
-            return
-        
-        # Обрабатываем как обычное изображение
-        await handle_image(message, FSMContext())
+        # Обрабатываем как обычное изображение; размер проверит _ingest_photo
+        await _ingest_photo(
+            message, state, document.file_id, document.file_size, f"{document.file_id}.{file_ext}"
+        )
     else:
         await message.answer(MESSAGES["unsupported_format"])
\ No newline at end of file
@@ -9,9 +9,10 @@ from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKe
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
-from shared.constants import MESSAGES, MAX_TEXT_LENGTH
+from shared.constants import MESSAGES, MAX_TEXT_LENGTH, MAX_FILE_SIZE
 from services.result_service import result_service
 from bot.utils.handlers_common import HandlerUtils
+from bot.utils.download import download_telegram_bytes
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -24,13 +25,15 @@ class TextProcessingStates(StatesGroup):
 @router.message(F.text)
 async def handle_text(message: Message, state: FSMContext):
     """Обработчик получения текстового сообщения с прямой обработкой"""
+    # Команды отсекаем первой и самой дешевой проверкой, до try
+    # и до любых обращений к состоянию и квоте
+    text = message.text
+    if text.startswith('/'):
+        return
+    
     try:
-        # Игнорируем команды
-        if message.text.startswith('/'):
-            return
-        
         # Проверяем длину текста
-        if len(message.text) > MAX_TEXT_LENGTH:
+        if len(text) > MAX_TEXT_LENGTH:
             await message.answer(MESSAGES["text_too_long"])
             return
         
@@ -53,7 +56,7 @@ async def handle_text(message: Message, state: FSMContext):
         
         # Прямая обработка через результирующий сервис
         await result_service._consume_quota(user_id)
-        content = await result_service.generator.generate_from_text(message.text)
+        content = await result_service.generator.generate_from_text(text)
         
         # Удаляем сообщение о загрузке после завершения генерации
         try:
@@ -78,7 +81,7 @@ async def handle_text(message: Message, state: FSMContext):
         await message.answer(formatted_content, parse_mode="Markdown", reply_markup=keyboard)
         
         # Сохраняем текст в состоянии
-        await state.update_data(text=message.text)
+        await state.update_data(text=text)
         
         logger.info(f"Прямая обработка текста завершена для пользователя {user_id}")
         
@@ -125,21 +128,18 @@ async def handle_image_with_text(message: Message, state: FSMContext):
         
         # Проверяем размер файла
         photo = message.photo[-1]
-        if photo.file_size > 20 * 1024 * 1024:  # 20MB
+        if photo.file_size > MAX_FILE_SIZE:
             await message.answer(MESSAGES["file_too_large"])
             return
         
-        # Скачиваем файл
-        import os
+        # Скачиваем фото в память: оно сразу уходит в генерацию,
+        # временный файл на диске не нужен
         file_info = await message.bot.get_file(photo.file_id)
-        file_path = f"temp/{photo.file_id}.jpg"
-        
-        os.makedirs("temp", exist_ok=True)
-        await message.bot.download_file(file_info.file_path, file_path)
+        image = await download_telegram_bytes(message.bot, file_info)
         
         # Используем централизованный сервис
         await result_service.process_combined_generation(
-            message, state, file_path, text, check_quota=True, generation_type="text"
+            message, state, None, text, check_quota=True, generation_type="text", image=image
         )
         
     except Exception as e:
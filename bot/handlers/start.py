@@ -3,19 +3,37 @@
 Значительно упрощен за счет выноса общей логики в утилиты.
 """
 
+import asyncio
 import logging
+from typing import Awaitable
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 
 from shared.constants import MESSAGES
+from shared.utils import FileUtils
 from bot.utils.handlers_common import HandlerUtils
 
 logger = logging.getLogger(__name__)
 router = Router()
 
 
+async def _reset_state(state: FSMContext) -> None:
+    """Очищает состояние и удаляет временное изображение из него"""
+    data = await state.get_data()
+    FileUtils.remove_file_in_background(data.get("image_path"))
+    await state.clear()
+
+
+async def _ignore_errors(request: Awaitable) -> None:
+    """Выполняет запрос к Telegram, игнорируя ошибки (сообщение уже удалено и т.п.)"""
+    try:
+        await request
+    except Exception:
+        pass
+
+
 @router.message(Command("start"))
 async def cmd_start(message: Message):
     """Обработчик команды /start"""
@@ -77,24 +95,13 @@ async def cmd_menu(message: Message):
 @router.callback_query(F.data == "back_to_start")
 async def back_to_start(callback: CallbackQuery, state: FSMContext):
     """Возврат в главное меню"""
-    # Очищаем временные файлы при возврате в главное меню
-    data = await state.get_data()
-    image_path = data.get("image_path")
-    if image_path:
-        try:
-            import os
-            if os.path.exists(image_path):
-                os.remove(image_path)
-                logger.info(f"Временный файл удален при возврате в меню: {image_path}")
-        except Exception as e:
-            logger.warning(f"Не удалось удалить временный файл: {e}")
-    
-    await state.clear()
-    # Удаляем текущее сообщение, чтобы оно не оставалось в истории
-    try:
-        await callback.message.delete()
-    except:
-        pass  # Игнорируем ошибки
+    # Очищаем состояние с временными файлами и удаляем текущее сообщение,
+    # чтобы оно не оставалось в истории. Запросы к хранилищу FSM и к Telegram
+    # независимы, поэтому выполняются одновременно
+    await asyncio.gather(
+        _reset_state(state),
+        _ignore_errors(callback.message.delete())
+    )
     
     # Отправляем новое меню
     await HandlerUtils.send_welcome_menu(callback, edit=False)
@@ -218,25 +225,12 @@ async def generate_more_callback(callback: CallbackQuery, state: FSMContext):
         generation_type = callback.data.split("_", 2)[2]  # generate_more_both -> both
         logger.info(f"generate_more_callback: callback_data={callback.data}, generation_type={generation_type}")
         
-        # Очищаем временные файлы при новой генерации
-        data = await state.get_data()
-        image_path = data.get("image_path")
-        if image_path:
-            try:
-                import os
-                if os.path.exists(image_path):
-                    os.remove(image_path)
-                    logger.info(f"Временный файл удален при новой генерации: {image_path}")
-            except Exception as e:
-                logger.warning(f"Не удалось удалить временный файл: {e}")
-        
-        await state.clear()
-        
-        # Убираем кнопки с текущего сообщения для сохранения истории
-        try:
-            await callback.message.edit_reply_markup(reply_markup=None)
-        except:
-            pass  # Игнорируем ошибки
+        # Очищаем временные файлы при новой генерации и убираем кнопки
+        # с текущего сообщения для сохранения истории - одновременно
+        await asyncio.gather(
+            _reset_state(state),
+            _ignore_errors(callback.message.edit_reply_markup(reply_markup=None))
+        )
         
         # Возвращаем к началу соответствующего процесса
         if generation_type == "both":
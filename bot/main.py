@@ -1,5 +1,6 @@
 import asyncio
 import os
+import sys
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.enums import ParseMode
@@ -8,8 +9,10 @@ from aiogram.types import BotCommand
 from config import BOT_TOKEN, ADMIN_ID
 from handlers import start, process_image, process_text, process_both, admin, subscriptions
 from middleware.rate_limiting import RateLimitMiddleware
+from shared.constants import TEMP_DIR
 from shared.logging_config import setup_logging
 from shared.utils import FileUtils
+from bot.utils.http import close_session
 
 logger = setup_logging(__name__)
 
@@ -20,6 +23,8 @@ async def main():
         from aiogram.client.default import DefaultBotProperties
         bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN))
         dp = Dispatcher(storage=MemoryStorage())
+        # Общая HTTP сессия закрывается вместе с диспетчером
+        dp.shutdown.register(close_session)
         
         # Добавляем rate limiting middleware
         dp.message.middleware(RateLimitMiddleware())
@@ -76,15 +81,21 @@ async def main():
         # Очищаем временные файлы при завершении
         try:
             import shutil
-            if os.path.exists("temp"):
-                shutil.rmtree("temp")
+            if os.path.exists(TEMP_DIR):
+                shutil.rmtree(TEMP_DIR)
         except (OSError, FileNotFoundError) as e:
             logger.warning(f"Не удалось очистить временные файлы: {e}")
             pass
 
 if __name__ == "__main__":
+    # uvloop нет под Windows
+    if sys.platform == "win32":
+        run = asyncio.run
+    else:
+        import uvloop
+        run = uvloop.run
     try:
-        asyncio.run(main())
+        run(main())
     except KeyboardInterrupt:
         logger.info("Бот остановлен пользователем")
     except Exception as e:
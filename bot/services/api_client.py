@@ -1,11 +1,15 @@
 """
 HTTP клиент для взаимодействия с внешним API сервисом
 """
+import asyncio
 import aiohttp
 import logging
 import json
+import os
 from typing import Dict, Optional
 from config import API_BASE_URL, API_TIMEOUT
+from shared.utils import FileUtils
+from bot.utils.http import get_session
 class APIError(Exception):
     """Исключение для ошибок API"""
     pass
@@ -13,22 +17,24 @@ class APIError(Exception):
 logger = logging.getLogger(__name__)
 
 class APIClient:
-    """HTTP клиент для взаимодействия с внешним API сервисом"""
+    """
+    HTTP клиент для взаимодействия с внешним API сервисом
+    
+    Сессией не владеет: open() подключает общую сессию бота из
+    bot.utils.http, закрывается она при остановке бота.
+    """
+    
+    # Один клиент на процесс (его держит ContentGenerator), атрибуты фиксированы
+    __slots__ = ('base_url', 'timeout', 'session')
     
     def __init__(self):
         self.base_url = API_BASE_URL
         self.timeout = aiohttp.ClientTimeout(total=API_TIMEOUT)
         self.session: Optional[aiohttp.ClientSession] = None
     
-    async def __aenter__(self):
-        """Асинхронный контекстный менеджер - вход"""
-        self.session = aiohttp.ClientSession(timeout=self.timeout)
-        return self
-    
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Асинхронный контекстный менеджер - выход"""
-        if self.session:
-            await self.session.close()
+    def open(self) -> None:
+        """Подключает клиент к общей HTTP сессии бота"""
+        self.session = get_session()
     
     async def _make_request(self, method: str, endpoint: str, data: Dict = None, files: Dict = None) -> Dict:
         """
@@ -38,13 +44,13 @@ class APIClient:
             method: HTTP метод (GET, POST, etc.)
             endpoint: Конечная точка API
             data: Данные для отправки (JSON)
-            files: Файлы для отправки (multipart/form-data)
+            files: Файлы для отправки (multipart/form-data), {поле: (имя файла, содержимое)}
             
         Returns:
             Dict с ответом от API
         """
         if not self.session:
-            raise RuntimeError("APIClient не инициализирован. Используйте async with APIClient() as client:")
+            raise RuntimeError("APIClient не подключен к сессии. Вызовите open()")
         
         url = f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
         
@@ -58,10 +64,10 @@ class APIClient:
                     form_data.add_field(key, value)
                 
                 # Добавляем файлы
-                for key, file_obj in files.items():
-                    form_data.add_field(key, file_obj, filename=file_obj.name)
+                for key, (filename, content) in files.items():
+                    form_data.add_field(key, content, filename=filename)
                 
-                async with self.session.request(method, url, data=form_data) as response:
+                async with self.session.request(method, url, data=form_data, timeout=self.timeout) as response:
                     response.raise_for_status()
                     return await response.json()
             else:
@@ -72,7 +78,7 @@ class APIClient:
                 for key, value in data.items():
                     form_data.add_field(key, value)
                 
-                async with self.session.request(method, url, data=form_data) as response:
+                async with self.session.request(method, url, data=form_data, timeout=self.timeout) as response:
                     response.raise_for_status()
                     return await response.json()
                     
@@ -93,12 +99,13 @@ class APIClient:
             logger.error(f"Неожиданная ошибка при запросе к {url}: {e}")
             raise APIError(f"Внутренняя ошибка: {e}")
     
-    async def generate_from_image(self, image_path: str) -> Dict:
+    async def generate_from_image(self, image_path: str, image: Optional[bytes] = None) -> Dict:
         """
         Отправляет изображение в API для генерации контента
         
         Args:
-            image_path: Путь к изображению
+            image_path: Путь к изображению (при переданном image - только имя файла)
+            image: Уже прочитанное содержимое файла, если есть
             
         Returns:
             Dict с сгенерированным контентом
@@ -106,13 +113,16 @@ class APIClient:
         logger.info(f"Отправка изображения в API: {image_path}")
         
         try:
-            with open(image_path, 'rb') as f:
-                files = {'image': f}
-                data = {'type': 'image_only'}
-                
-                response = await self._make_request('POST', '/generate', data=data, files=files)
-                logger.info("Успешно получен ответ от API для изображения")
-                return response
+            # Файл читается одним заданием в потоке; файловый объект в FormData
+            # aiohttp дочитывал бы порциями по 64 КБ, отдельным заданием на каждую
+            if image is None:
+                image = await asyncio.to_thread(FileUtils.read_bytes, image_path)
+            files = {'image': (os.path.basename(image_path), image)}
+            data = {'type': 'image_only'}
+            
+            response = await self._make_request('POST', '/generate', data=data, files=files)
+            logger.info("Успешно получен ответ от API для изображения")
+            return response
                 
         except FileNotFoundError:
             raise APIError(f"Файл изображения не найден: {image_path}")
@@ -142,13 +152,14 @@ class APIClient:
         logger.info("Успешно получен ответ от API для текста")
         return response
     
-    async def generate_from_both(self, image_path: str, text: str) -> Dict:
+    async def generate_from_both(self, image_path: str, text: str, image: Optional[bytes] = None) -> Dict:
         """
         Отправляет изображение и текст в API для генерации контента
         
         Args:
-            image_path: Путь к изображению
+            image_path: Путь к изображению (при переданном image - только имя файла)
             text: Текстовое описание товара
+            image: Уже прочитанное содержимое файла, если есть
             
         Returns:
             Dict с сгенерированным контентом
@@ -156,16 +167,17 @@ class APIClient:
         logger.info(f"Отправка изображения и текста в API: {text[:50]}...")
         
         try:
-            with open(image_path, 'rb') as f:
-                files = {'image': f}
-                data = {
-                    'type': 'both',
-                    'text': text
-                }
-                
-                response = await self._make_request('POST', '/generate', data=data, files=files)
-                logger.info("Успешно получен ответ от API для изображения и текста")
-                return response
+            if image is None:
+                image = await asyncio.to_thread(FileUtils.read_bytes, image_path)
+            files = {'image': (os.path.basename(image_path), image)}
+            data = {
+                'type': 'both',
+                'text': text
+            }
+            
+            response = await self._make_request('POST', '/generate', data=data, files=files)
+            logger.info("Успешно получен ответ от API для изображения и текста")
+            return response
                 
         except FileNotFoundError:
             raise APIError(f"Файл изображения не найден: {image_path}")
@@ -1,9 +1,15 @@
 """
 Сервис для генерации контента товаров
 """
+import asyncio
+import hashlib
 import logging
+import os
 import random
 from typing import Dict, List, Optional
+from cachetools import TTLCache
+from config import RESULT_CACHE_SIZE, RESULT_CACHE_TTL
+from shared.utils import FileUtils
 from .api_client import APIClient
 class APIError(Exception):
     """Исключение для ошибок API"""
@@ -11,6 +17,28 @@ class APIError(Exception):
 
 logger = logging.getLogger(__name__)
 
+
+def _cache_key(kind: str, image: Optional[bytes] = None, text: Optional[str] = None) -> str:
+    """Ключ кэша результатов: SHA-256 от типа запроса, байтов изображения и текста"""
+    digest = hashlib.sha256(kind.encode())
+    for part in (image, text.encode() if text is not None else None):
+        digest.update(b"\0")
+        if part is not None:
+            digest.update(part)
+    return digest.hexdigest()
+
+
+# Шаблон сообщения с результатом для Telegram
+_RESULT_TEMPLATE = (
+    "🎯 **{title}**\n\n"
+    "📝 **Краткое описание:**\n{short}\n\n"
+    "📄 **Полное описание:**\n{full}\n\n"
+    "✨ **Основные характеристики:**\n{features}\n"
+    "🔍 **SEO-ключи для продвижения:**\n{keywords}\n"
+    "👥 **Целевая аудитория:**\n{audience}\n\n"
+    "✅ **Готово!** Используйте это описание для создания карточки товара на маркетплейсах."
+)
+
 class ContentGenerator:
     """Сервис для генерации контента товаров"""
     
@@ -23,6 +51,27 @@ class ContentGenerator:
         self.features = ["Высокое качество", "Стильный дизайн", "Удобство использования", "Долговечность", "Экологичность", "Инновационные технологии", "Комфорт", "Практичность", "Модный тренд", "Универсальность"]
         self.target_audience = ["Молодежь 18-25 лет", "Активные люди 25-35 лет", "Студенты", "Офисные работники", "Спортсмены", "Модники и модницы", "Технологические энтузиасты"]
         self.seo_keywords = ["качественный", "стильный", "модный", "удобный", "практичный", "надежный", "красивый", "функциональный", "современный", "популярный"]
+        
+        # Один APIClient на все запросы: соединения с API переиспользуются
+        self._client: Optional[APIClient] = None
+        # Повторная отправка того же фото или текста не идет в API.
+        # Между чтением и записью кэша нет await, блокировка не нужна
+        self._cache: "TTLCache[str, Dict]" = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+    
+    def _get_client(self) -> APIClient:
+        """
+        Возвращает общий APIClient, подключенный к общей HTTP сессии бота
+        
+        Вызывается только из корутин, поэтому сессия создается уже внутри
+        работающего event loop. Между проверкой и созданием нет await,
+        так что блокировка не нужна. Закрытая при остановке сессия
+        подменяется новой при следующем обращении.
+        """
+        if self._client is None:
+            self._client = APIClient()
+        if self._client.session is None or self._client.session.closed:
+            self._client.open()
+        return self._client
 
     async def generate_from_image(self, image_path: str) -> Dict:
         """
@@ -37,8 +86,28 @@ class ContentGenerator:
         logger.info(f"Генерация контента из изображения: {image_path}")
         
         if self.use_api:
-            async with APIClient() as client:
-                return await client.generate_from_image(image_path)
+            image = await asyncio.to_thread(FileUtils.read_bytes, image_path)
+            return await self.generate_from_image_bytes(image, os.path.basename(image_path))
+        raise RuntimeError("API отключен")
+
+    async def generate_from_image_bytes(self, image: bytes, filename: str = "image.jpg") -> Dict:
+        """
+        Генерирует контент по изображению, уже находящемуся в памяти
+        
+        Args:
+            image: Содержимое файла изображения
+            filename: Имя файла для API, по расширению определяется формат
+            
+        Returns:
+            Dict с сгенерированным контентом
+        """
+        if self.use_api:
+            key = _cache_key("image", image)
+            content = self._cache.get(key)
+            if content is None:
+                content = await self._get_client().generate_from_image(filename, image)
+                self._cache[key] = content
+            return content
         raise RuntimeError("API отключен")
 
     async def generate_from_text(self, text: str) -> Dict:
@@ -54,8 +123,12 @@ class ContentGenerator:
         logger.info(f"Генерация контента из текста: {text[:50]}...")
         
         if self.use_api:
-            async with APIClient() as client:
-                return await client.generate_from_text(text)
+            key = _cache_key("text", text=text)
+            content = self._cache.get(key)
+            if content is None:
+                content = await self._get_client().generate_from_text(text)
+                self._cache[key] = content
+            return content
         raise RuntimeError("API отключен")
 
     async def generate_from_both(self, image_path: str, text: str) -> Dict:
@@ -72,8 +145,29 @@ class ContentGenerator:
         logger.info(f"Генерация контента из изображения и текста: {text[:50]}...")
         
         if self.use_api:
-            async with APIClient() as client:
-                return await client.generate_from_both(image_path, text)
+            image = await asyncio.to_thread(FileUtils.read_bytes, image_path)
+            return await self.generate_from_both_bytes(image, text, os.path.basename(image_path))
+        raise RuntimeError("API отключен")
+
+    async def generate_from_both_bytes(self, image: bytes, text: str, filename: str = "image.jpg") -> Dict:
+        """
+        Генерирует контент по изображению в памяти и тексту
+        
+        Args:
+            image: Содержимое файла изображения
+            text: Текстовое описание товара
+            filename: Имя файла для API, по расширению определяется формат
+            
+        Returns:
+            Dict с сгенерированным контентом
+        """
+        if self.use_api:
+            key = _cache_key("both", image, text)
+            content = self._cache.get(key)
+            if content is None:
+                content = await self._get_client().generate_from_both(filename, text, image)
+                self._cache[key] = content
+            return content
         raise RuntimeError("API отключен")
 
     async def _simulate_api_call(self, delay: float = 1.0):
@@ -86,38 +180,31 @@ class ContentGenerator:
         import asyncio
         await asyncio.sleep(delay)
 
-    def format_content(self, content: Dict) -> str:
+    @staticmethod
+    def format_content(content: Dict) -> str:
         """
         Форматирует контент для отправки в Telegram
         
+        Не зависит от состояния генератора. Работа - один str.format по
+        готовому шаблону над текстом не длиннее сообщения Telegram, это
+        единицы микросекунд: вынос в пул процессов стоил бы дороже
+        сериализации и IPC, поэтому форматирование остается в event loop.
+        
         Args:
             content: Словарь с контентом
             
         Returns:
             Отформатированная строка
         """
-        result = f"🎯 **{content['title']}**\n\n"
-        
-        result += f"📝 **Краткое описание:**\n{content['short_description']}\n\n"
-        
-        result += f"📄 **Полное описание:**\n{content['detailed_description']}\n\n"
-        
-        result += f"✨ **Основные характеристики:**\n"
-        for i, feature in enumerate(content['features'], 1):
-            result += f"{i}. {feature}\n"
-        result += "\n"
-        
-        result += f"🔍 **SEO-ключи для продвижения:**\n"
-        for keyword in content['seo_keywords']:
-            result += f"• {keyword}\n"
-        result += "\n"
-        
-        result += f"👥 **Целевая аудитория:**\n"
-        result += ", ".join(content['target_audience']) + "\n\n"
-        
-        result += "✅ **Готово!** Используйте это описание для создания карточки товара на маркетплейсах."
-        
-        return result
+        # Шаблон разобран один раз при импорте, списки собираются через join
+        return _RESULT_TEMPLATE.format(
+            title=content['title'],
+            short=content['short_description'],
+            full=content['detailed_description'],
+            features="".join(f"{i}. {feature}\n" for i, feature in enumerate(content['features'], 1)),
+            keywords="".join(f"• {keyword}\n" for keyword in content['seo_keywords']),
+            audience=", ".join(content['target_audience']),
+        )
     
     async def check_api_health(self) -> bool:
         """
@@ -130,8 +217,7 @@ class ContentGenerator:
             return False
             
         try:
-            async with APIClient() as client:
-                return await client.health_check()
+            return await self._get_client().health_check()
         except Exception as e:
             logger.warning(f"API недоступен: {e}")
             return False 
\ No newline at end of file
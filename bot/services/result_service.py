@@ -3,6 +3,7 @@
 Убирает дублирование кода и обеспечивает единообразную логику.
 """
 
+import asyncio
 import logging
 import os
 from typing import Dict, Any, Optional
@@ -13,10 +14,17 @@ from aiogram.fsm.context import FSMContext
 from services.generator import ContentGenerator
 from services.subscriptions import SubscriptionService
 from shared.constants import MESSAGES
+from shared.utils import FileUtils
 from bot.config import ADMIN_ID, ADMIN_IDS
 
 logger = logging.getLogger(__name__)
 
+# Клавиатура при нехватке запросов одинакова для всех, создаем ее один раз
+_NO_QUOTA_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="💳 Тарифы", callback_data="open_pricing")],
+    [InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_start_from_result")],
+])
+
 
 class ResultService:
     """Сервис для централизованной обработки результатов генерации"""
@@ -39,11 +47,7 @@ class ResultService:
             return True
             
         if not await self.subs.can_consume(user_id):
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="💳 Тарифы", callback_data="open_pricing")],
-                [InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_start_from_result")],
-            ])
-            await callback.message.edit_text("Недостаточно запросов. Пополните баланс.", reply_markup=keyboard)
+            await callback.message.edit_text("Недостаточно запросов. Пополните баланс.", reply_markup=_NO_QUOTA_KB)
             return False
         return True
     
@@ -97,12 +101,8 @@ class ResultService:
         await callback.message.answer(formatted_content, parse_mode="Markdown", reply_markup=keyboard)
     
     async def _cleanup_temp_file(self, file_path: Optional[str]) -> None:
-        """Безопасно удаляет временный файл"""
-        if file_path:
-            try:
-                os.remove(file_path)
-            except (OSError, FileNotFoundError):
-                logger.warning(f"Не удалось удалить временный файл: {file_path}")
+        """Удаляет временный файл в фоне, не задерживая ответ пользователю"""
+        FileUtils.remove_file_in_background(file_path)
     
     async def _handle_generation_error(self, callback: CallbackQuery, error: Exception, retry_callback: str) -> None:
         """Обрабатывает ошибки генерации"""
@@ -153,7 +153,9 @@ class ResultService:
             logger.info(f"Контент сгенерирован из изображения для пользователя {user_id}")
             
         except Exception as e:
+            # Состояние сохраняется для повтора, файла в нем уже нет
             await self._cleanup_temp_file(image_path)
+            await state.update_data(image_exists=False)
             await self._handle_generation_error(callback, e, retry_callback)
     
     async def process_text_generation(
@@ -201,7 +203,8 @@ class ResultService:
         image_path: str,
         text: str,
         check_quota: bool = True,
-        generation_type: str = "both"
+        generation_type: str = "both",
+        image: Optional[bytes] = None
     ) -> None:
         """
         Централизованная обработка комбинированной генерации.
@@ -209,30 +212,32 @@ class ResultService:
         Args:
             message: Сообщение от пользователя
             state: FSM состояние
-            image_path: Путь к изображению
+            image_path: Путь к изображению (None, если передано image)
             text: Текст для обработки
             check_quota: Нужно ли проверять квоту (False если уже проверили)
+            image: Изображение в памяти вместо файла на диске
         """
         user_id = message.from_user.id
         
         # Проверяем квоту если нужно
         if check_quota:
             if not self._is_admin(user_id) and not await self.subs.can_consume(user_id):
-                keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="💳 Тарифы", callback_data="open_pricing")],
-                    [InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_start_from_result")],
-                ])
-                await message.answer("Недостаточно запросов. Пополните баланс.", reply_markup=keyboard)
+                await message.answer("Недостаточно запросов. Пополните баланс.", reply_markup=_NO_QUOTA_KB)
                 return
         
         try:
-            # Отправляем сообщение о начале обработки
-            processing_msg = await message.answer(MESSAGES["processing"])
-            
-            # Генерируем контент
-            if check_quota:
-                await self._consume_quota(user_id)
-            content = await self.generator.generate_from_both(image_path, text)
+            # Сообщение о начале обработки, списание квоты и генерация
+            # не зависят друг от друга: запускаем их одновременно, чтобы
+            # запросы к Telegram и Redis шли на фоне запроса к API
+            if image is not None:
+                generation = self.generator.generate_from_both_bytes(image, text)
+            else:
+                generation = self.generator.generate_from_both(image_path, text)
+            processing_msg, _, content = await asyncio.gather(
+                message.answer(MESSAGES["processing"]),
+                self._consume_quota(user_id) if check_quota else asyncio.sleep(0),
+                generation
+            )
             
             # Убираем кнопки с сообщения о загрузке для сохранения истории
             await self._delete_processing_message(processing_msg)
@@ -4,9 +4,10 @@
 import logging
 import uuid
 from typing import Optional, Dict, Any
-import aiohttp
 import os
 
+from bot.utils.http import get_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -93,20 +94,20 @@ class YooMoneyPaymentService:
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.api_url}/payments",
-                    json=payment_data,
-                    headers=headers
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        logger.info(f"Платеж создан: {result['id']}")
-                        return result
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Ошибка создания платежа: {response.status} - {error_text}")
-                        return None
+            session = get_session()
+            async with session.post(
+                f"{self.api_url}/payments",
+                json=payment_data,
+                headers=headers
+            ) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    logger.info(f"Платеж создан: {result['id']}")
+                    return result
+                else:
+                    error_text = await response.text()
+                    logger.error(f"Ошибка создания платежа: {response.status} - {error_text}")
+                    return None
         
         except Exception as e:
             logger.error(f"Исключение при создании платежа: {e}")
@@ -138,18 +139,18 @@ class YooMoneyPaymentService:
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.api_url}/payments/{payment_id}",
-                    headers=headers
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Ошибка проверки платежа: {response.status} - {error_text}")
-                        return None
+            session = get_session()
+            async with session.get(
+                f"{self.api_url}/payments/{payment_id}",
+                headers=headers
+            ) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    return result
+                else:
+                    error_text = await response.text()
+                    logger.error(f"Ошибка проверки платежа: {response.status} - {error_text}")
+                    return None
         
         except Exception as e:
             logger.error(f"Исключение при проверке платежа: {e}")
@@ -0,0 +1,204 @@
+"""
+Скачивание файлов Telegram параллельными Range-запросами
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+import aiohttp
+from aiogram import Bot
+from aiogram.types import File
+
+from bot.utils.http import get_session
+
+logger = logging.getLogger(__name__)
+
+# Размер одного Range-запроса и число одновременных запросов на файл
+DOWNLOAD_CHUNK_SIZE = 2 * 1024 * 1024
+DOWNLOAD_MAX_CONCURRENCY = 8
+DOWNLOAD_TIMEOUT = aiohttp.ClientTimeout(total=60, sock_connect=10)
+
+# Приемник скачанных порций: (данные, смещение в файле)
+Writer = Callable[[bytes, int], None]
+
+# Скачивания в процессе: повторный запрос того же файла ждет уже идущее
+_inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+
+class _RangeNotSupported(Exception):
+    """Сервер ответил на Range-запрос целым файлом"""
+
+
+class TelegramDownloadError(Exception):
+    """Ошибка скачивания файла Telegram; в отличие от ошибок aiohttp, без URL с токеном"""
+
+
+def _coalesced(key: Hashable, start: Callable[[], Awaitable[Any]]) -> Awaitable[Any]:
+    """
+    Объединяет одновременные скачивания по ключу в одно.
+    
+    Первый вызов запускает задачу, остальные ждут ее же. Между проверкой
+    и записью в словарь нет await, поэтому отдельная блокировка не нужна.
+    shield не дает отмене одного ожидающего прервать скачивание для других.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(start())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return asyncio.shield(task)
+
+
+async def _download_whole(session: aiohttp.ClientSession, url: str, write: Writer) -> int:
+    """Скачивает файл одним потоком, записывая порции по мере получения"""
+    async with session.get(url, timeout=DOWNLOAD_TIMEOUT) as response:
+        response.raise_for_status()
+        offset = 0
+        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+            write(chunk, offset)
+            offset += len(chunk)
+    return offset
+
+
+async def _download_ranges(
+    session: aiohttp.ClientSession,
+    url: str,
+    write: Writer,
+    size: Optional[int],
+    chunk_size: int,
+    max_concurrency: int
+) -> int:
+    """
+    Скачивает файл порциями параллельно, каждую порцию передает write
+    вместе с ее смещением. Возвращает итоговый размер файла
+    """
+    if not size or size <= chunk_size:
+        return await _download_whole(session, url, write)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch(start: int) -> None:
+        end = min(start + chunk_size, size) - 1
+        async with semaphore:
+            async with session.get(
+                url, headers={"Range": f"bytes={start}-{end}"}, timeout=DOWNLOAD_TIMEOUT
+            ) as response:
+                response.raise_for_status()
+                if response.status != 206:
+                    raise _RangeNotSupported()
+                data = await response.read()
+        write(data, start)
+
+    tasks = [asyncio.ensure_future(fetch(start)) for start in range(0, size, chunk_size)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException as e:
+        # Остальные запросы не должны ничего записать после выхода
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if not isinstance(e, _RangeNotSupported):
+            raise
+        # URL не логируем: в нем токен бота
+        logger.debug(f"Сервер не поддерживает Range, скачиваем целиком ({size} байт)")
+        return await _download_whole(session, url, write)
+    return size
+
+
+async def _content_length(session: aiohttp.ClientSession, url: str) -> Optional[int]:
+    """Размер файла по HEAD-запросу"""
+    async with session.head(url, timeout=DOWNLOAD_TIMEOUT) as response:
+        response.raise_for_status()
+        return response.content_length
+
+
+def _write_file(dest: str, data: bytes) -> None:
+    """Записывает файл целиком; недописанный файл не оставляет"""
+    try:
+        with open(dest, 'wb') as f:
+            f.write(data)
+    except BaseException:
+        try:
+            os.unlink(dest)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+async def parallel_download_bytes(
+    url: str,
+    size: Optional[int] = None,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    max_concurrency: int = DOWNLOAD_MAX_CONCURRENCY
+) -> bytes:
+    """
+    Скачивает файл по URL в память параллельными Range-запросами
+
+    Args:
+        url: Адрес файла
+        size: Размер файла, если известен; иначе узнается HEAD-запросом
+        chunk_size: Размер одного Range-запроса
+        max_concurrency: Максимум одновременных запросов
+
+    Returns:
+        Содержимое файла
+    """
+    session = get_session()
+    if size is None:
+        size = await _content_length(session, url)
+
+    buffer = bytearray(size or 0)
+
+    def write(data: bytes, offset: int) -> None:
+        buffer[offset:offset + len(data)] = data
+
+    length = await _download_ranges(session, url, write, size, chunk_size, max_concurrency)
+    del buffer[length:]
+    return bytes(buffer)
+
+
+async def download_telegram_bytes(bot: Bot, file_info: File) -> bytes:
+    """
+    Скачивает файл Telegram в память, без временного файла на диске
+
+    Args:
+        bot: Экземпляр бота
+        file_info: Результат bot.get_file()
+
+    Returns:
+        Содержимое файла
+    """
+    return await _coalesced(
+        ("bytes", file_info.file_unique_id), lambda: _download_telegram_bytes(bot, file_info)
+    )
+
+
+async def _download_telegram_bytes(bot: Bot, file_info: File) -> bytes:
+    """Скачивание в память без объединения запросов"""
+    api = bot.session.api
+    if api.is_local:
+        buffer = await bot.download_file(file_info.file_path)
+        return buffer.getvalue()
+    try:
+        return await parallel_download_bytes(
+            api.file_url(bot.token, file_info.file_path), size=file_info.file_size
+        )
+    except aiohttp.ClientResponseError as e:
+        raise TelegramDownloadError(f"HTTP {e.status} при скачивании {file_info.file_path}") from None
+
+
+async def download_telegram_file(bot: Bot, file_info: File, dest: str) -> None:
+    """
+    Скачивает файл Telegram в dest
+
+    Args:
+        bot: Экземпляр бота
+        file_info: Результат bot.get_file()
+        dest: Путь для сохранения
+    """
+    # Сам файл скачивается через download_telegram_bytes: одновременные
+    # запросы одного файла Telegram объединяются по file_unique_id, а каждый
+    # вызывающий получает свою копию по своему пути и удаляет ее сам
+    data = await download_telegram_bytes(bot, file_info)
+    await asyncio.to_thread(_write_file, dest, data)
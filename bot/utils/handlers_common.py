@@ -2,14 +2,24 @@
 Общие утилиты для handlers для уменьшения дублирования кода.
 """
 
+import asyncio
+import os
+from functools import lru_cache
+
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 from shared.constants import MESSAGES
 
 
 class HandlerUtils:
-    """Утилиты для обработчиков"""
+    """
+    Утилиты для обработчиков.
+    
+    Клавиатуры не зависят от пользователя, поэтому фабрики кэшируют их:
+    каждый вариант строится один раз, дальше возвращается тот же объект.
+    """
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def create_main_menu_keyboard(show_demo: bool = False) -> InlineKeyboardMarkup:
         """Создает главное меню"""
         keyboard = []
@@ -36,6 +46,7 @@ class HandlerUtils:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def create_back_keyboard() -> InlineKeyboardMarkup:
         """Создает клавиатуру с кнопкой 'Назад'"""
         return InlineKeyboardMarkup(inline_keyboard=[
@@ -43,6 +54,7 @@ class HandlerUtils:
         ])
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def create_help_back_keyboard() -> InlineKeyboardMarkup:
         """Создает клавиатуру с кнопкой 'Назад' для помощи"""
         return InlineKeyboardMarkup(inline_keyboard=[
@@ -50,6 +62,7 @@ class HandlerUtils:
         ])
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def create_image_menu_keyboard() -> InlineKeyboardMarkup:
         """Создает меню для полученного изображения"""
         return InlineKeyboardMarkup(inline_keyboard=[
@@ -63,6 +76,7 @@ class HandlerUtils:
         ])
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def create_text_menu_keyboard() -> InlineKeyboardMarkup:
         """Создает меню для полученного текста"""
         return InlineKeyboardMarkup(inline_keyboard=[
@@ -100,6 +114,7 @@ class HandlerUtils:
             )
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def create_result_keyboard(show_upgrade_hint: bool = False, generation_type: str = "unknown") -> InlineKeyboardMarkup:
         """Создает упрощенную клавиатуру для результатов"""
         keyboard = [
@@ -118,6 +133,7 @@ class HandlerUtils:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def create_demo_keyboard() -> InlineKeyboardMarkup:
         """Создает клавиатуру для демо"""
         return InlineKeyboardMarkup(inline_keyboard=[
@@ -130,6 +146,7 @@ class HandlerUtils:
         ])
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def create_quota_exceeded_keyboard() -> InlineKeyboardMarkup:
         """Создает клавиатуру при превышении квоты"""
         return InlineKeyboardMarkup(inline_keyboard=[
@@ -183,6 +200,30 @@ class HandlerUtils:
                 parse_mode="Markdown"
             )
     
+    @staticmethod
+    async def state_image_exists(data: dict) -> bool:
+        """
+        Проверяет, что изображение из состояния FSM есть на диске.
+        
+        Флаг image_exists ставится сразу после скачивания и снимается
+        при удалении файла, поэтому stat нужен только для состояний без флага
+        и выполняется в отдельном потоке, не блокируя event loop.
+        
+        Args:
+            data: Данные состояния
+            
+        Returns:
+            True, если файл image_path существует
+        """
+        image_path = data.get("image_path")
+        if not image_path:
+            return False
+        
+        exists = data.get("image_exists")
+        if exists is None:
+            exists = await asyncio.to_thread(os.path.exists, image_path)
+        return exists
+    
     @staticmethod
     async def clean_message_and_send_new_menu(callback: CallbackQuery) -> None:
         """
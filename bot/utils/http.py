@@ -0,0 +1,41 @@
+"""
+Общая HTTP сессия бота для запросов к API, Telegram и платежному сервису
+"""
+from typing import Optional
+
+import aiohttp
+
+# Пул соединений на весь процесс: keep-alive соединения и DNS кэш
+# переиспользуются между запросами, TLS рукопожатие не повторяется
+HTTP_CONNECTION_LIMIT = 100
+HTTP_DNS_CACHE_TTL = 300
+HTTP_KEEPALIVE_TIMEOUT = 60
+
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Возвращает общую сессию, создавая ее при первом обращении.
+
+    Вызывается из корутин, поэтому сессия привязывается к работающему
+    event loop. Таймауты задаются на уровне отдельных запросов.
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=HTTP_CONNECTION_LIMIT,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT
+            )
+        )
+    return _session
+
+
+async def close_session() -> None:
+    """Закрывает общую сессию при остановке бота"""
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
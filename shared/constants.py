@@ -1,10 +1,10 @@
 import os
-from typing import Set
+from typing import FrozenSet
 
 MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", 20 * 1024 * 1024))
 MAX_TEXT_LENGTH = int(os.getenv("MAX_TEXT_LENGTH", 5000))
 
-SUPPORTED_IMAGE_FORMATS: Set[str] = {'jpg', 'jpeg', 'png', 'webp', 'bmp', 'gif'}
+SUPPORTED_IMAGE_FORMATS: FrozenSet[str] = frozenset({'jpg', 'jpeg', 'png', 'webp', 'bmp', 'gif'})
 
 TEMP_DIR = "temp"
 UPLOAD_DIR = "uploads"
@@ -30,6 +30,13 @@ def setup_logging(
     if format_string is None:
         format_string = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     
+    # Если формат не использует поля потока/процесса, не собираем их для каждой записи
+    if '%(thread' not in format_string:
+        logging.logThreads = False
+    if '%(process' not in format_string:
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
+    
     # Создаем форматтер
     formatter = logging.Formatter(format_string)
     
@@ -1,14 +1,20 @@
 """
 Общие утилиты для проекта
 """
+import asyncio
 import os
 import logging
+import uuid
+from functools import lru_cache
 from typing import Optional, Dict, Any
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from .constants import MAX_FILE_SIZE, MAX_TEXT_LENGTH, SUPPORTED_IMAGE_FORMATS, TEMP_DIR
 
 logger = logging.getLogger(__name__)
 
+# Ссылки на фоновые задачи удаления, чтобы их не собрал GC до завершения
+_background_tasks: "set[asyncio.Task]" = set()
+
 class FileUtils:
     """Утилиты для работы с файлами"""
     
@@ -17,16 +23,51 @@ class FileUtils:
         """Создает папку для временных файлов если её нет"""
         os.makedirs(TEMP_DIR, exist_ok=True)
     
+    @staticmethod
+    def temp_file_path(file_id: str, ext: str = "jpg") -> str:
+        """
+        Уникальный путь для временного файла.
+        
+        Фоновое удаление прежнего файла с тем же file_id может еще
+        выполняться, поэтому путь не должен повторяться между скачиваниями.
+        """
+        return f"{TEMP_DIR}/{file_id}_{uuid.uuid4().hex}.{ext}"
+    
+    @staticmethod
+    def read_bytes(file_path: str) -> bytes:
+        """Читает файл целиком; из корутин вызывается через asyncio.to_thread"""
+        with open(file_path, 'rb') as f:
+            return f.read()
+    
     @staticmethod
     def safe_remove_file(file_path: str) -> None:
         """Безопасно удаляет файл с логированием ошибок"""
+        if not file_path:
+            return
         try:
-            if file_path and os.path.exists(file_path):
-                os.remove(file_path)
-                logger.debug(f"Файл удален: {file_path}")
-        except (OSError, FileNotFoundError) as e:
+            os.unlink(file_path)
+            logger.debug(f"Файл удален: {file_path}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
             logger.warning(f"Не удалось удалить файл {file_path}: {e}")
     
+    @staticmethod
+    def remove_file_in_background(file_path: Optional[str]) -> None:
+        """
+        Удаляет файл в потоке, не дожидаясь завершения.
+        
+        unlink на медленном или сетевом диске не блокирует event loop,
+        а ответ пользователю уходит, не дожидаясь удаления.
+        """
+        if not file_path:
+            return
+        task = asyncio.get_running_loop().create_task(
+            asyncio.to_thread(FileUtils.safe_remove_file, file_path)
+        )
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+    
     @staticmethod
     def validate_image_file(file_path: str) -> bool:
         """Проверяет валидность изображения"""
@@ -76,6 +117,7 @@ class KeyboardFactory:
         ])
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def create_retry_keyboard(retry_callback: str) -> InlineKeyboardMarkup:
         """Создает клавиатуру с кнопкой 'Попробовать ещё раз' и 'Назад'"""
         return InlineKeyboardMarkup(inline_keyboard=[